@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Conversation Write Benchmark
+Measures message throughput of ConversationManager with synchronous commits
+against the write-behind queue, with many conversations appending turns
+concurrently. Each mode writes to its own temporary database.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+from conversation_manager import ConversationManager
+
+async def messages_per_second(database_path: str, write_behind: bool,
+                              conversations: int, turns: int) -> float:
+    """Append turns to concurrent conversations and return messages written per second"""
+    manager = ConversationManager(f"sqlite+aiosqlite:///{database_path}", write_behind=write_behind)
+    conversation_ids = [
+        (await manager.create_conversation(f"bench_user_{i}")).conversation_id
+        for i in range(conversations)
+    ]
+
+    async def chat(conversation_id: str):
+        for turn in range(turns):
+            await manager.append_turn(conversation_id, f"question {turn}", f"answer {turn}", "help")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(chat(conversation_id) for conversation_id in conversation_ids))
+    await manager.flush()  # Count queued messages only once they are on disk
+    elapsed = time.perf_counter() - start
+
+    await manager.close()
+    return conversations * turns * 2 / elapsed
+
+async def main():
+    conversations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    print("📊 Conversation Write Benchmark")
+    print("=" * 50)
+    print(f"Conversations: {conversations}, turns each: {turns}\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        sync_rate = await messages_per_second(
+            os.path.join(directory, "sync.db"), False, conversations, turns
+        )
+        batched_rate = await messages_per_second(
+            os.path.join(directory, "write_behind.db"), True, conversations, turns
+        )
+
+    print(f"{'mode':<20}{'messages/sec':>14}")
+    print(f"{'synchronous':<20}{sync_rate:>14.0f}")
+    print(f"{'write-behind':<20}{batched_rate:>14.0f}")
+    print(f"\nSpeedup: {batched_rate / sync_rate:.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
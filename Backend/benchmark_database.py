@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Catalog Read Path Benchmark
+Compares per-call latency of the old pandas read_sql_query path against the
+cursor-based row mapping DatabaseManager now uses, for get_product_by_id and
+search_products. Both paths query the database on every call; the catalog
+cache is bypassed. Run from the directory holding the catalog CSVs.
+"""
+
+import sys
+import time
+import pandas as pd
+from typing import Callable
+
+from database import db_manager, PRODUCT_BY_ID_QUERY, PRODUCT_SEARCH_QUERY
+
+def time_per_call(func: Callable[[], object], iterations: int) -> float:
+    """Return the mean latency of func in microseconds"""
+    func()  # Warm up statement caches
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def pandas_product_by_id(product_id: int):
+    """The previous implementation of get_product_by_id"""
+    with db_manager.pool.connection() as conn:
+        df = pd.read_sql_query(PRODUCT_BY_ID_QUERY, conn, params=[product_id])
+    if not df.empty:
+        return df.iloc[0].to_dict()
+    return {}
+
+def pandas_search_products(search_term: str, limit: int = 20):
+    """The previous implementation of search_products (FTS query, pandas mapping)"""
+    match_expression = db_manager._build_match_expression(search_term)
+    with db_manager.pool.connection() as conn:
+        df = pd.read_sql_query(PRODUCT_SEARCH_QUERY, conn, params=[match_expression, limit])
+    return df.to_dict('records')
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    product_id = db_manager.get_products(limit=1)[0]['id']
+    search_term = "jeans"
+
+    print("📊 Catalog Read Path Benchmark")
+    print("=" * 50)
+    print(f"Iterations per case: {iterations}\n")
+
+    cases = [
+        ("get_product_by_id",
+         lambda: pandas_product_by_id(product_id),
+         # Bypass the catalog cache so both paths hit the database
+         lambda: db_manager._fetch_one(PRODUCT_BY_ID_QUERY, [product_id]) or {}),
+        ("search_products",
+         lambda: pandas_search_products(search_term),
+         lambda: db_manager.search_products(search_term)),
+    ]
+
+    print(f"{'method':<20}{'pandas (µs)':>14}{'cursor (µs)':>14}{'speedup':>10}")
+    for name, pandas_path, cursor_path in cases:
+        pandas_us = time_per_call(pandas_path, iterations)
+        cursor_us = time_per_call(cursor_path, iterations)
+        print(f"{name:<20}{pandas_us:>14.1f}{cursor_us:>14.1f}{pandas_us / cursor_us:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
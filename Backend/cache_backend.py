@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import redis
+except ImportError:  # Only needed for the shared Redis backend
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend(ABC):
+    """Key/value cache with expiry and pub/sub notifications
+
+    Values must be JSON-serializable so every backend can store them. Cache
+    errors are logged and treated as misses; they never fail a request.
+    Publishing to a channel calls the callbacks subscribed to it, in every
+    process sharing the backend.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def publish(self, channel: str, message: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def subscribe(self, channel: str, callback: Callable[[Dict[str, Any]], None]):
+        ...
+
+    def close(self):
+        pass
+
+class InProcessBackend(CacheBackend):
+    """LRU cache held in this process, with TTL expiry
+
+    Thread-safe, since catalog reads run on a thread pool. Values are stored
+    as-is, so callers must not mutate what they get back. Pub/sub only
+    reaches subscribers in the same process.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._subscribers: Dict[str, List[Callable]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def publish(self, channel: str, message: Dict[str, Any]):
+        for callback in list(self._subscribers.get(channel, ())):
+            try:
+                callback(message)
+            except Exception as e:
+                logger.error(f"Error handling cache message on {channel}: {e}")
+
+    def subscribe(self, channel: str, callback: Callable[[Dict[str, Any]], None]):
+        self._subscribers.setdefault(channel, []).append(callback)
+
+class RedisBackend(CacheBackend):
+    """Cache shared by every worker through a Redis-protocol server
+
+    Keys and channels are namespaced with prefix. Subscriptions are served
+    by a background thread. client can be any object with the redis-py
+    interface used here (get, set, delete, publish, pubsub), such as a
+    fake server in tests; otherwise one is created from url, which needs the
+    redis package.
+
+    Calls block on the network, so async code should make them from a
+    worker thread. socket_timeout and socket_connect_timeout bound each
+    call, so an unreachable server costs a miss rather than a stalled worker.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", client: Any = None,
+                 prefix: str = "ecommerce:", socket_timeout: float = 0.5,
+                 socket_connect_timeout: float = 0.5):
+        if client is None:
+            if redis is None:
+                raise ImportError("RedisBackend needs the redis package (pip install redis)")
+            client = redis.Redis.from_url(
+                url, socket_timeout=socket_timeout, socket_connect_timeout=socket_connect_timeout
+            )
+        self.client = client
+        self.prefix = prefix
+        self._pubsub = None
+        self._listener = None
+        self._subscribers: Dict[str, List[Callable]] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        try:
+            self.client.set(
+                self.prefix + key, json.dumps(value, default=str),
+                px=int(ttl * 1000) if ttl is not None else None
+            )
+        except Exception as e:
+            logger.warning(f"Cache write failed for {key}: {e}")
+
+    def delete(self, key: str):
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Cache delete failed for {key}: {e}")
+
+    def publish(self, channel: str, message: Dict[str, Any]):
+        try:
+            self.client.publish(self.prefix + channel, json.dumps(message, default=str))
+        except Exception as e:
+            logger.warning(f"Cache publish failed on {channel}: {e}")
+
+    def subscribe(self, channel: str, callback: Callable[[Dict[str, Any]], None]):
+        callbacks = self._subscribers.setdefault(channel, [])
+        callbacks.append(callback)
+        if len(callbacks) > 1:
+            return
+
+        def handle(message):
+            try:
+                payload = json.loads(message['data'])
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Ignoring malformed cache message on {channel}: {e}")
+                return
+            for subscriber in list(self._subscribers.get(channel, ())):
+                try:
+                    subscriber(payload)
+                except Exception as e:
+                    logger.error(f"Error handling cache message on {channel}: {e}")
+
+        try:
+            if self._pubsub is None:
+                self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{self.prefix + channel: handle})
+            if self._listener is None:
+                self._listener = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        except Exception as e:
+            # Run without notifications rather than fail startup; a later subscribe retries
+            del self._subscribers[channel]
+            logger.warning(f"Cache subscribe failed on {channel}, messages from other workers will be missed: {e}")
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+        self.client.close()
+
+def create_cache_backend(url: Optional[str] = None) -> CacheBackend:
+    """Backend for a CACHE_URL-style setting: redis:// or rediss:// URLs share a Redis server"""
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    return InProcessBackend()
+
+_cache_backend: Optional[CacheBackend] = None
+_cache_backend_lock = threading.Lock()
+
+def get_cache_backend() -> CacheBackend:
+    """Return the process-wide cache backend, configured from CACHE_URL"""
+    global _cache_backend
+    if _cache_backend is None:
+        with _cache_backend_lock:
+            if _cache_backend is None:
+                _cache_backend = create_cache_backend(os.getenv("CACHE_URL"))
+    return _cache_backend
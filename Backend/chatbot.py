@@ -2,8 +2,81 @@ import re
 import random
 import pickle
 import os
-from typing import Dict, List, Any, Tuple
+import threading
+from typing import Dict, List, Any, Optional, Tuple
 from database import db_manager
+from text_preprocessing import get_text_preprocessor
+
+class ProductNameMatcher:
+    """Token trie over product names, built once from the products table.
+
+    The trie is rebuilt lazily whenever ``db_manager.catalog_version`` changes,
+    so a CSV reload is picked up on the next lookup.
+    """
+    
+    _TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+    _END = object()  # Trie key holding the (id, name) of a complete product name
+    
+    def __init__(self, db=db_manager):
+        self.db = db
+        self._trie = {}
+        self._version = None
+        self._lock = threading.Lock()
+    
+    def _tokenize(self, text: str) -> List[str]:
+        return self._TOKEN_PATTERN.findall(text.lower())
+    
+    def _build(self):
+        """Build the trie from every product name in the catalog"""
+        trie = {}
+        try:
+            rows = self.db.get_product_names()
+        except Exception as e:
+            print(f"❌ Error building product name index: {e}")
+            rows = []
+        
+        for product_id, name in rows:
+            tokens = self._tokenize(str(name))
+            if not tokens:
+                continue
+            node = trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            # Keep the first product in table order when names collide
+            node.setdefault(self._END, (product_id, name))
+        
+        return trie
+    
+    def refresh(self, force: bool = False):
+        """Rebuild the trie if the catalog changed since the last build"""
+        version = self.db.catalog_version
+        if not force and version == self._version:
+            return
+        with self._lock:
+            if force or version != self._version:
+                self._trie = self._build()
+                self._version = version
+    
+    def find(self, message: str) -> Optional[Tuple[Any, str]]:
+        """Return (id, name) of the longest product name contained in the message"""
+        self.refresh()
+        trie = self._trie
+        tokens = self._tokenize(message)
+        
+        best = None
+        best_length = 0
+        for start in range(len(tokens)):
+            node = trie
+            for position in range(start, len(tokens)):
+                node = node.get(tokens[position])
+                if node is None:
+                    break
+                length = position - start + 1
+                if self._END in node and length > best_length:
+                    best = node[self._END]
+                    best_length = length
+        
+        return best
 
 class EcommerceChatbot:
     def __init__(self, use_ml_model=True):
@@ -23,6 +96,9 @@ class EcommerceChatbot:
             'help': ['help', 'support', 'assist', 'problem', 'issue']
         }
         
+        # Product name index used for entity extraction
+        self.product_matcher = ProductNameMatcher()
+        
         # Load ML models if available
         if self.use_ml_model:
             self._load_ml_models()
@@ -57,6 +133,9 @@ class EcommerceChatbot:
                 with open(os.path.join(models_dir, 'intent_classifier.pkl'), 'rb') as f:
                     self.intent_classifier = pickle.load(f)
                 
+                # Load NLTK resources now rather than on the first classified message
+                get_text_preprocessor()
+                
                 self.ml_models_loaded = True
                 print("✅ ML models loaded successfully!")
             else:
@@ -69,61 +148,51 @@ class EcommerceChatbot:
     
     def _preprocess_text(self, text: str) -> str:
         """Preprocess text for ML model"""
-        import nltk
-        from nltk.corpus import stopwords
-        from nltk.tokenize import word_tokenize
-        from nltk.stem import WordNetLemmatizer
-        
-        # Download required NLTK data if not available
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords')
-        
-        try:
-            nltk.data.find('corpora/wordnet')
-        except LookupError:
-            nltk.download('wordnet')
-        
-        # Preprocess text
-        text = text.lower()
-        text = re.sub(r'[^a-zA-Z\s]', ' ', text)
-        
-        tokens = word_tokenize(text)
-        stop_words = set(stopwords.words('english'))
-        lemmatizer = WordNetLemmatizer()
-        
-        tokens = [lemmatizer.lemmatize(token) for token in tokens 
-                 if token not in stop_words and len(token) > 2]
-        
-        return ' '.join(tokens)
+        return get_text_preprocessor().preprocess(text)
     
-    def classify_intent(self, message: str) -> str:
-        """Classify the intent of the user message using ML or rule-based approach"""
+    def _predict_intents(self, messages: List[str]) -> List[Tuple[str, float]]:
+        """Predict (intent, confidence) for many messages with one vectorizer/classifier pass"""
+        processed_texts = [self._preprocess_text(message) for message in messages]
+        vectorized_texts = self.vectorizer.transform(processed_texts)
+        
+        # predict() is argmax over predict_proba(), so one call gives both label and confidence
+        probabilities = self.intent_classifier.predict_proba(vectorized_texts)
+        best = probabilities.argmax(axis=1)
+        classes = self.intent_classifier.classes_
+        
+        return [(str(classes[column]), float(probabilities[row, column]))
+                for row, column in enumerate(best)]
+    
+    def classify_intents(self, messages: List[str]) -> List[Tuple[str, Optional[float]]]:
+        """Classify a batch of messages, returning (intent, confidence) for each.
+        
+        Confidence is None when the rule-based fallback produced the intent.
+        """
+        predictions = [None] * len(messages)
         
         # Try ML model first if available
-        if self.ml_models_loaded:
+        if self.ml_models_loaded and messages:
             try:
-                processed_text = self._preprocess_text(message)
-                vectorized_text = self.vectorizer.transform([processed_text])
-                
-                prediction = self.intent_classifier.predict(vectorized_text)[0]
-                probabilities = self.intent_classifier.predict_proba(vectorized_text)[0]
-                confidence = max(probabilities)
-                
-                # Use ML prediction if confidence is high enough
-                if confidence > 0.3:  # Threshold for ML confidence
-                    return prediction
-                    
+                predictions = self._predict_intents(messages)
             except Exception as e:
                 print(f"ML prediction failed, falling back to rule-based: {e}")
         
-        # Fallback to rule-based classification
+        results = []
+        for message, prediction in zip(messages, predictions):
+            # Use ML prediction if confidence is high enough
+            if prediction and prediction[1] > 0.3:  # Threshold for ML confidence
+                results.append(prediction)
+            else:
+                results.append((self._classify_rule_based(message), None))
+        
+        return results
+    
+    def classify_intent(self, message: str) -> str:
+        """Classify the intent of the user message using ML or rule-based approach"""
+        return self.classify_intents([message])[0][0]
+    
+    def _classify_rule_based(self, message: str) -> str:
+        """Classify the intent of the user message with keyword rules"""
         message_lower = message.lower()
         
         # Check for inventory intent first (before product search)
@@ -152,12 +221,10 @@ class EcommerceChatbot:
         message_lower = message.lower()
         
         # Extract product names, brands, categories
-        products = db_manager.get_products(limit=1000)
-        for product in products:
-            if product['name'].lower() in message_lower:
-                entities['product_name'] = product['name']
-                entities['product_id'] = product['id']
-                break
+        match = self.product_matcher.find(message)
+        if match:
+            entities['product_name'] = match[1]
+            entities['product_id'] = match[0]
         
         # Extract order numbers (simple pattern)
         order_pattern = r'order[:\s]*#?(\d+)'
@@ -325,9 +392,10 @@ Need to track a specific order? Please provide your order number."""
             
             if products:
                 response = f"Here's the current stock information for {found_product} products:\n\n"
+                inventories = db_manager.get_inventory_status_many([product['id'] for product in products])
                 
                 for i, product in enumerate(products, 1):
-                    inventory = db_manager.get_inventory_status(product['id'])
+                    inventory = inventories[product['id']]
                     response += f"{i}. {product['name']} by {product['brand']}\n"
                     response += f"   Available: {inventory['available_items']} items\n"
                     response += f"   Total Stock: {inventory['total_items']} items\n"
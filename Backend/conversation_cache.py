@@ -0,0 +1,180 @@
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from conversation_models import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+# Rough per-object overhead added to the text size when estimating entry bytes
+OBJECT_OVERHEAD_BYTES = 256
+
+class CachedConversation:
+    __slots__ = ('conversation', 'messages', 'floor_id', 'size')
+
+    def __init__(self, conversation: Conversation):
+        self.conversation = conversation
+        self.messages: Optional[List[Message]] = None  # None until a window is loaded
+        self.floor_id = 0
+        self.size = 0
+
+class ConversationCache:
+    """LRU cache of active conversations and their most recent messages
+
+    Each entry holds a Conversation row and, once loaded, a window of its
+    newest messages: every message with an id above floor_id, plus any
+    written since that have no id yet. A floor_id of 0 means the window is
+    the whole conversation. ConversationManager writes new messages through
+    to the window, which keeps at most window_size of them.
+
+    Entries are evicted least recently used first once there are more than
+    max_entries or their estimated size exceeds max_bytes. A database load
+    is only cached if nothing was written to that conversation while it ran,
+    so a slow read can't overwrite newer state.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 16 * 1024 * 1024,
+                 window_size: int = 50):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.window_size = window_size
+        self._entries: "OrderedDict[str, CachedConversation]" = OrderedDict()
+        self._bytes = 0
+        # conversation_id -> [write generation, loads in flight], kept only while loads run
+        self._loads: Dict[str, List[int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _message_size(self, message: Message) -> int:
+        return len(message.content or "") + len(message.entities or "") + OBJECT_OVERHEAD_BYTES
+
+    def _entry_size(self, entry: CachedConversation) -> int:
+        size = len(entry.conversation.summary or "") + OBJECT_OVERHEAD_BYTES
+        if entry.messages:
+            size += sum(self._message_size(message) for message in entry.messages)
+        return size
+
+    def _resize(self, conversation_id: str, entry: CachedConversation):
+        self._bytes -= entry.size
+        entry.size = self._entry_size(entry)
+        self._bytes += entry.size
+        self._entries.move_to_end(conversation_id)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def _note_write(self, conversation_id: str):
+        load = self._loads.get(conversation_id)
+        if load is not None:
+            load[0] += 1
+
+    @contextmanager
+    def loading(self, conversation_id: str) -> Iterator[Callable[[], bool]]:
+        """Track a database load of a conversation
+
+        Yields a function telling whether the conversation is unchanged since
+        the load began, i.e. whether its result may be cached.
+        """
+        load = self._loads.setdefault(conversation_id, [0, 0])
+        generation = load[0]
+        load[1] += 1
+        try:
+            yield lambda: load[0] == generation
+        finally:
+            load[1] -= 1
+            if not load[1]:
+                del self._loads[conversation_id]
+
+    def get_conversation(self, conversation_id: str) -> Optional[Conversation]:
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(conversation_id)
+        self.hits += 1
+        return entry.conversation
+
+    def get_messages(self, conversation_id: str, limit: Optional[int],
+                     after_id: int = None) -> Optional[List[Message]]:
+        """Newest messages after after_id in chronological order, or None if the window can't tell"""
+        entry = self._entries.get(conversation_id)
+        if entry is not None and entry.messages is not None:
+            after_id = after_id or 0
+            newer = [message for message in entry.messages if message.id is None or message.id > after_id]
+            if after_id >= entry.floor_id or (limit is not None and len(newer) >= limit):
+                self._entries.move_to_end(conversation_id)
+                self.hits += 1
+                return newer[-limit:] if limit is not None else newer
+        self.misses += 1
+        return None
+
+    def put_conversation(self, conversation: Conversation, messages: List[Message] = None):
+        """Cache a conversation, optionally with its complete message list"""
+        entry = self._entries.get(conversation.conversation_id)
+        if entry is None:
+            entry = self._entries[conversation.conversation_id] = CachedConversation(conversation)
+        else:
+            entry.conversation = conversation
+        if messages is not None:
+            entry.messages, entry.floor_id = list(messages), 0
+            self._trim(entry)
+        self._resize(conversation.conversation_id, entry)
+
+    def put_messages(self, conversation_id: str, messages: List[Message], floor_id: int):
+        """Cache the window of a conversation's messages with ids above floor_id
+
+        Ignored unless the conversation itself is cached.
+        """
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return
+        entry.messages, entry.floor_id = list(messages), floor_id
+        self._trim(entry)
+        self._resize(conversation_id, entry)
+
+    def append_messages(self, conversation_id: str, messages: List[Message]):
+        """Write newly stored messages through to a cached conversation"""
+        self._note_write(conversation_id)
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return
+        entry.conversation.updated_at = messages[-1].created_at
+        if entry.messages is not None:
+            entry.messages.extend(messages)
+            self._trim(entry)
+        self._resize(conversation_id, entry)
+
+    def _trim(self, entry: CachedConversation):
+        """Drop messages beyond window_size from the front of the window"""
+        overflow = len(entry.messages) - self.window_size
+        if overflow <= 0:
+            return
+        removed, entry.messages = entry.messages[:overflow], entry.messages[overflow:]
+        if any(message.id is None for message in removed):
+            # No id to move the floor to; reload the window next time
+            entry.messages, entry.floor_id = None, 0
+        else:
+            entry.floor_id = max(entry.floor_id, removed[-1].id)
+
+    def invalidate(self, conversation_id: str):
+        self._note_write(conversation_id)
+        entry = self._entries.pop(conversation_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
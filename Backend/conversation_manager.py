@@ -1,217 +1,640 @@
 import json
+import base64
+import asyncio
 import logging
-from typing import List, Dict, Optional, Tuple
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.exc import SQLAlchemyError
+from contextlib import nullcontext
+from typing import List, Dict, Optional, Set, Tuple
+from sqlalchemy import and_, bindparam, create_engine, func, insert, inspect, or_, select, text, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import aliased
+from conversation_cache import ConversationCache
 from conversation_models import Base, User, Conversation, Message, generate_conversation_id, generate_message_id
-from datetime import datetime
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+def encode_cursor(message: Message) -> str:
+    """Opaque pagination cursor pointing just before a message"""
+    key = json.dumps([message.created_at.isoformat(), message.id])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Return the (created_at, id) key of a cursor, raising ValueError if it is malformed"""
+    try:
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(message_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
 class ConversationManager:
-    def __init__(self, database_url: str = "sqlite:///conversations.db"):
-        """Initialize the conversation manager with database connection"""
-        self.engine = create_engine(database_url, echo=False)
-        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+    def __init__(self, database_url: str = "sqlite+aiosqlite:///conversations.db",
+                 write_behind: bool = False, max_pending_writes: int = 1000,
+                 flush_interval: float = 0.05, max_batch_size: int = 500,
+                 max_flush_retries: int = 3, cache: ConversationCache = None):
+        """Initialize the conversation manager with an async database connection
+        
+        With write_behind, add_message and append_turn queue their messages
+        and return immediately. A background writer inserts queued messages
+        from all conversations in one transaction every flush_interval
+        seconds. At most max_pending_writes writes are queued; callers wait
+        when the queue is full. Reads of a conversation include its queued
+        messages, and close() flushes the queue. Messages that can't be
+        written are dropped with an error logged, and their conversations
+        are evicted from the cache.
+        
+        With a cache, conversations and their recent messages are served from
+        memory; writes go through to it and close/delete invalidate it.
+        Cached entries are never checked against the database, so a cache
+        is only safe when this manager is the conversation's only writer.
+        """
+        self.database_url = make_url(database_url)
+        self.engine = create_async_engine(self.database_url, echo=False)
+        # Objects are used after their session closes, so don't expire them on commit
+        self.SessionLocal = async_sessionmaker(
+            bind=self.engine, autoflush=False, expire_on_commit=False
+        )
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.max_flush_retries = max_flush_retries
+        self._write_queue: "asyncio.Queue[Tuple[str, List[Message]]]" = asyncio.Queue(maxsize=max_pending_writes)
+        self._pending: Dict[str, List[Message]] = {}  # conversation_id -> queued messages, oldest first
+        self._writer: Optional[asyncio.Task] = None
+        self.cache = cache
         self._create_tables()
     
     def _create_tables(self):
-        """Create database tables if they don't exist"""
+        """Create database tables if they don't exist
+        
+        Runs once at startup on a short-lived synchronous engine, so the
+        manager can be constructed outside the event loop.
+        """
+        sync_url = self.database_url.set(drivername=self.database_url.get_backend_name())
+        engine = create_engine(sync_url, echo=False)
         try:
-            Base.metadata.create_all(bind=self.engine)
+            Base.metadata.create_all(bind=engine)
+            self._add_missing_columns(engine)
+            self._create_missing_indexes(engine)
             logger.info("Conversation database tables created successfully")
         except Exception as e:
             logger.error(f"Error creating tables: {e}")
+        finally:
+            engine.dispose()
+    
+    def _add_missing_columns(self, engine):
+        """Add model columns that an existing database predates
+        
+        create_all only creates missing tables, so columns added to the models
+        later are added here with ALTER TABLE. New columns must be nullable.
+        """
+        inspector = inspect(engine)
+        with engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                existing = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing:
+                        column_type = column.type.compile(dialect=engine.dialect)
+                        conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                        logger.info(f"Added column {table.name}.{column.name}")
+    
+    def _create_missing_indexes(self, engine):
+        """Create model indexes that an existing database predates"""
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+    
+    def _cache_load(self, conversation_id: str):
+        """Context manager yielding whether a database load may be cached"""
+        if self.cache is None:
+            return nullcontext(lambda: False)
+        return self.cache.loading(conversation_id)
     
-    def get_db_session(self) -> Session:
+    def _invalidate(self, conversation_id: str):
+        if self.cache is not None:
+            self.cache.invalidate(conversation_id)
+    
+    def get_db_session(self) -> AsyncSession:
         """Get a database session"""
         return self.SessionLocal()
     
-    def create_or_get_user(self, user_id: str, username: str = None, email: str = None) -> User:
+    async def close(self):
+        """Flush queued messages and dispose of the database engine"""
+        await self.flush()
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        await self.engine.dispose()
+    
+    async def flush(self):
+        """Wait until every queued message has been written"""
+        if self._writer is None:
+            return  # Nothing was ever queued
+        self._ensure_writer()
+        await self._write_queue.join()
+    
+    def _ensure_writer(self):
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._run_writer())
+    
+    async def _enqueue(self, conversation_id: str, messages: List[Message]):
+        """Queue messages for the background writer"""
+        self._ensure_writer()
+        await self._write_queue.put((conversation_id, messages))
+        # Nothing awaits between the put and this, so the writer can't see the
+        # batch before it is visible to readers
+        self._pending.setdefault(conversation_id, []).extend(messages)
+        if self.cache is not None:
+            self.cache.append_messages(conversation_id, messages)
+    
+    async def _run_writer(self):
+        """Write queued messages in batches until cancelled"""
+        while True:
+            batch = [await self._write_queue.get()]
+            dropped = set()
+            try:
+                if self.flush_interval:
+                    # Let concurrent turns join the batch
+                    await asyncio.sleep(self.flush_interval)
+                while len(batch) < self.max_batch_size and not self._write_queue.empty():
+                    batch.append(self._write_queue.get_nowait())
+                dropped = await self._write_batch(batch)
+            except Exception as e:
+                logger.error(f"Error in conversation write-behind writer: {e}")
+                dropped = {conversation_id for conversation_id, _ in batch}
+            finally:
+                for conversation_id, messages in batch:
+                    pending = self._pending.get(conversation_id)
+                    if pending is not None:
+                        del pending[:len(messages)]
+                        if not pending:
+                            del self._pending[conversation_id]
+                    self._write_queue.task_done()
+                # The cache still holds the dropped messages. Invalidate only
+                # now they have left _pending, so a reload can't bring them back
+                for conversation_id in dropped:
+                    self._invalidate(conversation_id)
+    
+    async def _write_batch(self, batch: List[Tuple[str, List[Message]]]) -> Set[str]:
+        """Write a batch of queued messages, returning the conversations whose messages were dropped
+        
+        The batch is written in one transaction. If that fails for good, each
+        conversation is written in a transaction of its own, so a bad row only
+        loses the messages of its own conversation.
+        """
+        if await self._write_messages(batch):
+            return set()
+        
+        by_conversation: Dict[str, List[Tuple[str, List[Message]]]] = {}
+        for conversation_id, messages in batch:
+            by_conversation.setdefault(conversation_id, []).append((conversation_id, messages))
+        if len(by_conversation) == 1:
+            return set(by_conversation)
+        
+        logger.warning(f"Writing queued messages of {len(by_conversation)} conversations one at a time")
+        dropped = set()
+        for conversation_id, items in by_conversation.items():
+            if not await self._write_messages(items):
+                dropped.add(conversation_id)
+        return dropped
+    
+    async def _write_messages(self, batch: List[Tuple[str, List[Message]]]) -> bool:
+        """Insert queued messages and bump their conversations in one transaction
+        
+        Transient errors are retried up to max_flush_retries times; integrity
+        and data errors are not, since the same rows would fail again.
+        Returns whether the messages were written.
+        """
+        columns = [column.name for column in Message.__table__.columns if column.name != 'id']
+        rows = [
+            {column: getattr(message, column) for column in columns}
+            for _, messages in batch for message in messages
+        ]
+        updated_at = {}
+        for conversation_id, messages in batch:
+            updated_at[conversation_id] = messages[-1].created_at
+        conversations = Conversation.__table__
+        bump = update(conversations).where(
+            conversations.c.conversation_id == bindparam('target_id')
+        ).values(updated_at=bindparam('target_updated_at'))
+        
+        for attempt in range(self.max_flush_retries + 1):
+            try:
+                async with self.engine.begin() as conn:
+                    await conn.execute(insert(Message.__table__), rows)
+                    await conn.execute(bump, [
+                        {'target_id': conversation_id, 'target_updated_at': timestamp}
+                        for conversation_id, timestamp in updated_at.items()
+                    ])
+                logger.info(f"Wrote {len(rows)} queued messages for {len(updated_at)} conversations")
+                return True
+            except (IntegrityError, DataError) as e:
+                logger.error(f"Failed to write {len(rows)} queued messages for {len(updated_at)} conversations: {e}")
+                return False
+            except SQLAlchemyError as e:
+                if attempt == self.max_flush_retries:
+                    logger.error(f"Failed to write {len(rows)} queued messages after {attempt + 1} attempts: {e}")
+                    return False
+                logger.warning(f"Error writing queued messages, retrying: {e}")
+                await asyncio.sleep(self.flush_interval or 0.1)
+        return False
+    
+    async def create_or_get_user(self, user_id: str, username: str = None, email: str = None) -> User:
         """Create a new user or get existing user"""
-        session = self.get_db_session()
-        try:
-            user = session.query(User).filter(User.user_id == user_id).first()
-            if not user:
-                user = User(
-                    user_id=user_id,
-                    username=username,
-                    email=email
-                )
-                session.add(user)
-                session.commit()
-                logger.info(f"Created new user: {user_id}")
-            return user
-        except SQLAlchemyError as e:
-            session.rollback()
-            logger.error(f"Error creating/getting user: {e}")
-            raise
-        finally:
-            session.close()
+        async with self.get_db_session() as session:
+            try:
+                result = await session.execute(select(User).filter(User.user_id == user_id))
+                user = result.scalars().first()
+                if not user:
+                    user = User(
+                        user_id=user_id,
+                        username=username,
+                        email=email
+                    )
+                    session.add(user)
+                    await session.commit()
+                    logger.info(f"Created new user: {user_id}")
+                return user
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.error(f"Error creating/getting user: {e}")
+                raise
     
-    def create_conversation(self, user_id: str, title: str = None) -> Conversation:
+    async def create_conversation(self, user_id: str, title: str = None) -> Conversation:
         """Create a new conversation for a user"""
-        session = self.get_db_session()
-        try:
-            # Ensure user exists
-            self.create_or_get_user(user_id)
-            
-            conversation = Conversation(
-                conversation_id=generate_conversation_id(),
-                user_id=user_id,
-                title=title or f"Conversation {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}"
-            )
-            session.add(conversation)
-            session.commit()
-            logger.info(f"Created new conversation: {conversation.conversation_id}")
-            return conversation
-        except SQLAlchemyError as e:
-            session.rollback()
-            logger.error(f"Error creating conversation: {e}")
-            raise
-        finally:
-            session.close()
+        # Ensure user exists
+        await self.create_or_get_user(user_id)
+        
+        async with self.get_db_session() as session:
+            try:
+                conversation = Conversation(
+                    conversation_id=generate_conversation_id(),
+                    user_id=user_id,
+                    title=title or f"Conversation {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}"
+                )
+                session.add(conversation)
+                await session.commit()
+                logger.info(f"Created new conversation: {conversation.conversation_id}")
+                if self.cache is not None:
+                    # A new conversation has no messages, so its whole (empty) history is known
+                    self.cache.put_conversation(conversation, messages=[])
+                return conversation
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.error(f"Error creating conversation: {e}")
+                raise
     
-    def get_conversation(self, conversation_id: str) -> Optional[Conversation]:
+    async def get_conversation(self, conversation_id: str) -> Optional[Conversation]:
         """Get a conversation by ID"""
-        session = self.get_db_session()
-        try:
-            conversation = session.query(Conversation).filter(
-                Conversation.conversation_id == conversation_id
-            ).first()
-            return conversation
-        except SQLAlchemyError as e:
-            logger.error(f"Error getting conversation: {e}")
-            return None
-        finally:
-            session.close()
+        if self.cache is not None:
+            conversation = self.cache.get_conversation(conversation_id)
+            if conversation is not None:
+                return conversation
+        
+        with self._cache_load(conversation_id) as cacheable:
+            async with self.get_db_session() as session:
+                try:
+                    result = await session.execute(
+                        select(Conversation).filter(Conversation.conversation_id == conversation_id)
+                    )
+                    conversation = result.scalars().first()
+                    if conversation is not None and conversation.is_active and cacheable():
+                        self.cache.put_conversation(conversation)
+                    return conversation
+                except SQLAlchemyError as e:
+                    logger.error(f"Error getting conversation: {e}")
+                    return None
     
-    def get_user_conversations(self, user_id: str, limit: int = 10) -> List[Conversation]:
+    async def get_user_conversations(self, user_id: str, limit: int = 10) -> List[Conversation]:
         """Get conversations for a user"""
-        session = self.get_db_session()
-        try:
-            conversations = session.query(Conversation).filter(
-                Conversation.user_id == user_id,
-                Conversation.is_active == True
-            ).order_by(Conversation.updated_at.desc()).limit(limit).all()
-            return conversations
-        except SQLAlchemyError as e:
-            logger.error(f"Error getting user conversations: {e}")
-            return []
-        finally:
-            session.close()
+        async with self.get_db_session() as session:
+            try:
+                result = await session.execute(
+                    select(Conversation).filter(
+                        Conversation.user_id == user_id,
+                        Conversation.is_active == True
+                    ).order_by(Conversation.updated_at.desc()).limit(limit)
+                )
+                return list(result.scalars().all())
+            except SQLAlchemyError as e:
+                logger.error(f"Error getting user conversations: {e}")
+                return []
+    
+    async def get_user_conversation_summaries(self, user_id: str, limit: int = 10) -> List[Dict]:
+        """Get summaries of a user's active conversations in a single query
+        
+        Same shape as get_conversation_summary, with the message count and the
+        last message computed in SQL instead of loading the messages.
+        """
+        message_count = select(func.count(Message.id)).where(
+            Message.conversation_id == Conversation.conversation_id
+        ).correlate(Conversation).scalar_subquery()
+        last_message_id = select(func.max(Message.id)).where(
+            Message.conversation_id == Conversation.conversation_id
+        ).correlate(Conversation).scalar_subquery()
+        last_message = aliased(Message)
+        
+        async with self.get_db_session() as session:
+            try:
+                result = await session.execute(
+                    select(
+                        Conversation,
+                        message_count.label('message_count'),
+                        last_message.content,
+                        last_message.created_at
+                    ).outerjoin(
+                        last_message, last_message.id == last_message_id
+                    ).filter(
+                        Conversation.user_id == user_id,
+                        Conversation.is_active == True
+                    ).order_by(Conversation.updated_at.desc()).limit(limit)
+                )
+                return [
+                    {
+                        'conversation_id': conversation.conversation_id,
+                        'title': conversation.title,
+                        'user_id': conversation.user_id,
+                        'created_at': conversation.created_at.isoformat(),
+                        'updated_at': conversation.updated_at.isoformat(),
+                        'is_active': conversation.is_active,
+                        'message_count': count,
+                        'last_message': last_content,
+                        'last_message_time': last_time.isoformat() if last_time else None
+                    }
+                    for conversation, count, last_content, last_time in result.all()
+                ]
+            except SQLAlchemyError as e:
+                logger.error(f"Error getting user conversation summaries: {e}")
+                return []
     
-    def add_message(self, conversation_id: str, role: str, content: str, 
-                   intent: str = None, confidence: float = None, 
-                   entities: Dict = None) -> Message:
+    def _new_message(self, conversation_id: str, role: str, content: str, intent: str = None,
+                     confidence: float = None, entities: Dict = None) -> Message:
+        return Message(
+            conversation_id=conversation_id,
+            message_id=generate_message_id(),
+            role=role,
+            content=content,
+            intent=intent,
+            confidence=int(confidence * 100) if confidence else None,
+            entities=json.dumps(entities) if entities else None,
+            created_at=datetime.utcnow()
+        )
+    
+    async def add_message(self, conversation_id: str, role: str, content: str,
+                          intent: str = None, confidence: float = None,
+                          entities: Dict = None) -> Message:
         """Add a message to a conversation"""
-        session = self.get_db_session()
-        try:
-            message = Message(
-                conversation_id=conversation_id,
-                message_id=generate_message_id(),
-                role=role,
-                content=content,
-                intent=intent,
-                confidence=int(confidence * 100) if confidence else None,
-                entities=json.dumps(entities) if entities else None
-            )
-            session.add(message)
-            
-            # Update conversation timestamp
-            conversation = session.query(Conversation).filter(
-                Conversation.conversation_id == conversation_id
-            ).first()
-            if conversation:
-                conversation.updated_at = datetime.utcnow()
-            
-            session.commit()
-            logger.info(f"Added message to conversation {conversation_id}")
+        message = self._new_message(conversation_id, role, content, intent, confidence, entities)
+        if self.write_behind:
+            await self._enqueue(conversation_id, [message])
             return message
-        except SQLAlchemyError as e:
-            session.rollback()
-            logger.error(f"Error adding message: {e}")
-            raise
-        finally:
-            session.close()
+        
+        async with self.get_db_session() as session:
+            try:
+                session.add(message)
+                
+                # Update conversation timestamp
+                await session.execute(
+                    update(Conversation).where(
+                        Conversation.conversation_id == conversation_id
+                    ).values(updated_at=datetime.utcnow())
+                )
+                
+                await session.commit()
+                logger.info(f"Added message to conversation {conversation_id}")
+                if self.cache is not None:
+                    self.cache.append_messages(conversation_id, [message])
+                return message
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.error(f"Error adding message: {e}")
+                raise
     
-    def get_conversation_messages(self, conversation_id: str, limit: int = 50) -> List[Message]:
-        """Get messages for a conversation"""
-        session = self.get_db_session()
-        try:
-            messages = session.query(Message).filter(
-                Message.conversation_id == conversation_id
-            ).order_by(Message.created_at.desc()).limit(limit).all()
-            return list(reversed(messages))  # Return in chronological order
-        except SQLAlchemyError as e:
-            logger.error(f"Error getting conversation messages: {e}")
-            return []
-        finally:
-            session.close()
+    async def append_turn(self, conversation_id: str, user_message: str, assistant_message: str,
+                          intent: str = None, confidence: float = None,
+                          entities: Dict = None) -> Tuple[Message, Message]:
+        """Store a user message and the assistant's reply in one transaction
+        
+        Both messages and the conversation timestamp are written with a
+        single commit.
+        """
+        user = self._new_message(conversation_id, "user", user_message, intent, confidence, entities)
+        assistant = self._new_message(conversation_id, "assistant", assistant_message, intent, None, entities)
+        # Keep the pair in order when sorted by created_at
+        assistant.created_at = user.created_at + timedelta(microseconds=1)
+        if self.write_behind:
+            await self._enqueue(conversation_id, [user, assistant])
+            return user, assistant
+        
+        async with self.get_db_session() as session:
+            try:
+                session.add_all([user, assistant])
+                
+                await session.execute(
+                    update(Conversation).where(
+                        Conversation.conversation_id == conversation_id
+                    ).values(updated_at=assistant.created_at)
+                )
+                
+                await session.commit()
+                logger.info(f"Added turn to conversation {conversation_id}")
+                if self.cache is not None:
+                    self.cache.append_messages(conversation_id, [user, assistant])
+                return user, assistant
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.error(f"Error adding turn: {e}")
+                raise
+    
+    async def get_conversation_messages(self, conversation_id: str, limit: Optional[int] = 50,
+                                        after_id: int = None, include_pending: bool = True) -> List[Message]:
+        """Get messages for a conversation
+        
+        after_id restricts the result to messages stored after that Message.id,
+        e.g. the ones not yet covered by the conversation summary. A limit of
+        None returns all of them. Messages still queued for the write-behind
+        writer are included unless include_pending is False; they have no id.
+        The cache only serves and stores reads that include queued messages.
+        """
+        use_cache = self.cache is not None and include_pending
+        if use_cache:
+            messages = self.cache.get_messages(conversation_id, limit, after_id)
+            if messages is not None:
+                return messages
+        
+        # Snapshot the queue before querying: a batch written meanwhile then
+        # shows up twice (and is de-duplicated) rather than not at all
+        pending = list(self._pending.get(conversation_id, ())) if include_pending else []
+        with self._cache_load(conversation_id) as cacheable:
+            async with self.get_db_session() as session:
+                try:
+                    query = select(Message).filter(Message.conversation_id == conversation_id)
+                    if after_id is not None:
+                        query = query.filter(Message.id > after_id)
+                    result = await session.execute(
+                        query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+                    )
+                    messages = list(reversed(result.scalars().all()))  # Return in chronological order
+                    if pending:
+                        stored = {message.message_id for message in messages}
+                        messages.extend(message for message in pending if message.message_id not in stored)
+                        messages.sort(key=lambda message: message.created_at)
+                        if limit is not None:
+                            messages = messages[-limit:]
+                
+                    if use_cache and cacheable():
+                        if limit is None or len(messages) < limit:
+                            # Everything after after_id was read
+                            self.cache.put_messages(conversation_id, messages, after_id or 0)
+                        elif messages[0].id is not None:
+                            self.cache.put_messages(conversation_id, messages, messages[0].id - 1)
+                    return messages
+                except SQLAlchemyError as e:
+                    logger.error(f"Error getting conversation messages: {e}")
+                    return []
+    
+    async def get_conversation_messages_page(self, conversation_id: str, limit: int = 50,
+                                             before: str = None) -> Tuple[List[Message], Optional[str]]:
+        """Get a page of messages, newest first across pages, using keyset pagination
+        
+        Returns up to limit messages older than the before cursor (or the
+        newest ones without it) in chronological order, plus the cursor for
+        the next, older page, or None when there are no older messages. Each
+        page is one index range scan on (conversation_id, created_at, id),
+        however deep it is. Raises ValueError for a malformed cursor.
+        """
+        if before is not None:
+            before_created_at, before_id = decode_cursor(before)
+        elif conversation_id in self._pending:
+            # Queued messages have no id to build a cursor from yet
+            await self.flush()
+        
+        async with self.get_db_session() as session:
+            try:
+                query = select(Message).filter(Message.conversation_id == conversation_id)
+                if before is not None:
+                    query = query.filter(or_(
+                        Message.created_at < before_created_at,
+                        and_(Message.created_at == before_created_at, Message.id < before_id)
+                    ))
+                result = await session.execute(
+                    query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
+                )
+                messages = list(result.scalars().all())
+            except SQLAlchemyError as e:
+                logger.error(f"Error getting conversation messages page: {e}")
+                return [], None
+        
+        next_cursor = encode_cursor(messages[limit - 1]) if len(messages) > limit else None
+        return list(reversed(messages[:limit])), next_cursor
+    
+    def _message_to_dict(self, message: Message) -> Dict:
+        return {
+            'role': message.role,
+            'content': message.content,
+            'timestamp': message.created_at.isoformat(),
+            'intent': message.intent,
+            'confidence': message.confidence / 100 if message.confidence else None,
+            'entities': json.loads(message.entities) if message.entities else None
+        }
     
-    def get_conversation_history(self, conversation_id: str, limit: int = 10) -> List[Dict]:
+    async def get_conversation_history(self, conversation_id: str, limit: int = 10,
+                                       after_id: int = None) -> List[Dict]:
         """Get conversation history as a list of message dictionaries"""
-        messages = self.get_conversation_messages(conversation_id, limit)
-        history = []
-        for message in messages:
-            history.append({
-                'role': message.role,
-                'content': message.content,
-                'timestamp': message.created_at.isoformat(),
-                'intent': message.intent,
-                'confidence': message.confidence / 100 if message.confidence else None,
-                'entities': json.loads(message.entities) if message.entities else None
-            })
-        return history
-    
-    def close_conversation(self, conversation_id: str) -> bool:
+        messages = await self.get_conversation_messages(conversation_id, limit, after_id)
+        return [self._message_to_dict(message) for message in messages]
+    
+    async def get_conversation_history_page(self, conversation_id: str, limit: int = 50,
+                                            before: str = None) -> Tuple[List[Dict], Optional[str]]:
+        """Get a page of conversation history and the cursor for the next, older page"""
+        messages, next_cursor = await self.get_conversation_messages_page(conversation_id, limit, before)
+        return [self._message_to_dict(message) for message in messages], next_cursor
+    
+    async def update_conversation_summary(self, conversation_id: str, summary: str,
+                                          summarized_until_id: int,
+                                          previous_until_id: Optional[int]) -> bool:
+        """Store a new rolling summary for a conversation
+        
+        The update only applies if the summary still ends at previous_until_id,
+        so two concurrent summarizations of the same conversation can't
+        overwrite each other. Returns whether the summary was stored.
+        """
+        async with self.get_db_session() as session:
+            try:
+                if previous_until_id is None:
+                    unchanged = Conversation.summarized_until_id.is_(None)
+                else:
+                    unchanged = Conversation.summarized_until_id == previous_until_id
+                result = await session.execute(
+                    update(Conversation).where(
+                        Conversation.conversation_id == conversation_id, unchanged
+                    ).values(
+                        summary=summary,
+                        summarized_until_id=summarized_until_id,
+                        # A summary isn't conversation activity; keep the ordering timestamp
+                        updated_at=Conversation.updated_at
+                    )
+                )
+                await session.commit()
+                # Cached messages written behind have no ids to compare with the new boundary
+                self._invalidate(conversation_id)
+                return result.rowcount == 1
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.error(f"Error updating conversation summary: {e}")
+                return False
+    
+    async def close_conversation(self, conversation_id: str) -> bool:
         """Mark a conversation as inactive"""
-        session = self.get_db_session()
-        try:
-            conversation = session.query(Conversation).filter(
-                Conversation.conversation_id == conversation_id
-            ).first()
-            if conversation:
-                conversation.is_active = False
-                session.commit()
-                logger.info(f"Closed conversation: {conversation_id}")
-                return True
-            return False
-        except SQLAlchemyError as e:
-            session.rollback()
-            logger.error(f"Error closing conversation: {e}")
-            return False
-        finally:
-            session.close()
+        async with self.get_db_session() as session:
+            try:
+                result = await session.execute(
+                    select(Conversation).filter(Conversation.conversation_id == conversation_id)
+                )
+                conversation = result.scalars().first()
+                if conversation:
+                    conversation.is_active = False
+                    await session.commit()
+                    self._invalidate(conversation_id)
+                    logger.info(f"Closed conversation: {conversation_id}")
+                    return True
+                return False
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.error(f"Error closing conversation: {e}")
+                return False
     
-    def delete_conversation(self, conversation_id: str) -> bool:
+    async def delete_conversation(self, conversation_id: str) -> bool:
         """Delete a conversation and all its messages"""
-        session = self.get_db_session()
-        try:
-            conversation = session.query(Conversation).filter(
-                Conversation.conversation_id == conversation_id
-            ).first()
-            if conversation:
-                session.delete(conversation)
-                session.commit()
-                logger.info(f"Deleted conversation: {conversation_id}")
-                return True
-            return False
-        except SQLAlchemyError as e:
-            session.rollback()
-            logger.error(f"Error deleting conversation: {e}")
-            return False
-        finally:
-            session.close()
+        # Queued messages would otherwise be written after the delete
+        await self.flush()
+        async with self.get_db_session() as session:
+            try:
+                result = await session.execute(
+                    select(Conversation).filter(Conversation.conversation_id == conversation_id)
+                )
+                conversation = result.scalars().first()
+                if conversation:
+                    # AsyncSession.delete loads the messages collection for the cascade
+                    await session.delete(conversation)
+                    await session.commit()
+                    self._invalidate(conversation_id)
+                    logger.info(f"Deleted conversation: {conversation_id}")
+                    return True
+                return False
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.error(f"Error deleting conversation: {e}")
+                return False
     
-    def get_conversation_summary(self, conversation_id: str) -> Dict:
+    async def get_conversation_summary(self, conversation_id: str) -> Dict:
         """Get a summary of a conversation"""
-        conversation = self.get_conversation(conversation_id)
+        conversation = await self.get_conversation(conversation_id)
         if not conversation:
             return None
         
-        messages = self.get_conversation_messages(conversation_id)
+        messages = await self.get_conversation_messages(conversation_id)
         
         return {
             'conversation_id': conversation.conversation_id,
@@ -223,4 +646,4 @@ class ConversationManager:
             'message_count': len(messages),
             'last_message': messages[-1].content if messages else None,
             'last_message_time': messages[-1].created_at.isoformat() if messages else None
-        } 
\ No newline at end of file
+        }
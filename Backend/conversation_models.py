@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -23,12 +23,18 @@ class User(Base):
 class Conversation(Base):
     """Conversation model for storing conversation sessions"""
     __tablename__ = 'conversations'
+    __table_args__ = (
+        # A user's active conversations, most recently updated first
+        Index('ix_conversations_user_active_updated', 'user_id', 'is_active', 'updated_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     conversation_id = Column(String(50), unique=True, nullable=False, index=True)
     user_id = Column(String(50), ForeignKey('users.user_id'), nullable=False)
     title = Column(String(255), nullable=True)
     is_active = Column(Boolean, default=True)
+    summary = Column(Text, nullable=True)  # Rolling summary of the older messages
+    summarized_until_id = Column(Integer, nullable=True)  # Message.id of the last summarized message
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -39,6 +45,10 @@ class Conversation(Base):
 class Message(Base):
     """Message model for storing individual messages in conversations"""
     __tablename__ = 'messages'
+    __table_args__ = (
+        # A conversation's messages in order; SQLite appends the id to every index entry
+        Index('ix_messages_conversation_created', 'conversation_id', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     conversation_id = Column(String(50), ForeignKey('conversations.conversation_id'), nullable=False)
@@ -1,49 +1,572 @@
 import sqlite3
+import re
 import pandas as pd
 import os
-from typing import List, Dict, Any
+import queue
+import json
+import hashlib
+import functools
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Any, Optional
 import logging
+from cache_backend import CacheBackend, InProcessBackend, get_cache_backend
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pub/sub channel announcing catalog reloads to every worker sharing the cache backend
+CATALOG_CHANNEL = "catalog_reloaded"
+
+# Catalog cache entries are keyed by catalog version, so a reload orphans them;
+# the TTL lets a shared backend drop the orphans
+CATALOG_CACHE_TTL = 3600
+
+def catalog_cached(method):
+    """Cache a DatabaseManager read under the current catalog version
+    
+    For reads that only change when the catalog CSVs are reloaded. Results
+    come back from the backend shared, so callers must not mutate them.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = self._catalog_cache_key(method.__name__, args, kwargs)
+        value = self.cache.get(key)
+        if value is None:
+            value = method(self, *args, **kwargs)
+            self.cache.set(key, value, ttl=CATALOG_CACHE_TTL)
+        return value
+    return wrapper
+
+# Hot-path queries, shared with the EXPLAIN QUERY PLAN diagnostics
+PRODUCT_BY_ID_QUERY = """
+    SELECT p.*, dc.name as distribution_center_name
+    FROM products p
+    LEFT JOIN distribution_centers dc ON p.distribution_center_id = dc.id
+    WHERE p.id = ?
+"""
+
+USER_ORDERS_QUERY = """
+    SELECT o.*, COUNT(oi.id) as item_count
+    FROM orders o
+    LEFT JOIN order_items oi ON o.order_id = oi.order_id
+    WHERE o.user_id = ?
+    GROUP BY o.order_id
+    ORDER BY o.created_at DESC
+"""
+
+ORDER_DETAILS_QUERY = """
+    SELECT oi.*, p.name as product_name, p.brand, p.category
+    FROM order_items oi
+    JOIN products p ON oi.product_id = p.id
+    WHERE oi.order_id = ?
+"""
+
+INVENTORY_STATUS_QUERY = """
+    SELECT total_items, available_items, sold_items
+    FROM inventory_summary
+    WHERE product_id = ?
+"""
+
+# Per-product stock aggregate materialized into inventory_summary
+INVENTORY_AGGREGATE_QUERY = """
+    SELECT 
+        product_id,
+        COUNT(*) as total_items,
+        COUNT(CASE WHEN sold_at IS NULL THEN 1 END) as available_items,
+        COUNT(CASE WHEN sold_at IS NOT NULL THEN 1 END) as sold_items
+    FROM inventory_items
+    WHERE product_id IS NOT NULL
+    GROUP BY product_id
+"""
+
+# Popularity windows in days, anchored on the latest order item rather than
+# the wall clock so historical catalogs still rank; None means all time
+POPULARITY_WINDOWS = {'7d': 7, '30d': 30, 'all': None}
+POPULARITY_TOP_K = 50
+
+# Sales per product in a window, ranked overall (scope '') and within each
+# category (scope = category). Timestamps are compared as 'YYYY-MM-DD HH:MM:SS',
+# dropping any 'T' separator, fraction or zone suffix.
+POPULARITY_RANK_QUERY = """
+    WITH sales AS (
+        SELECT
+            p.id, p.name, p.brand, p.category, p.retail_price,
+            COUNT(oi.id) as sales_count
+        FROM order_items oi
+        JOIN products p ON p.id = oi.product_id
+        WHERE ? IS NULL OR replace(substr(oi.created_at, 1, 19), 'T', ' ') >= datetime(
+            (SELECT MAX(replace(substr(created_at, 1, 19), 'T', ' ')) FROM order_items), ?
+        )
+        GROUP BY p.id
+    ),
+    ranked AS (
+        SELECT *,
+            ROW_NUMBER() OVER (ORDER BY sales_count DESC, id) as overall_rank,
+            ROW_NUMBER() OVER (PARTITION BY category ORDER BY sales_count DESC, id) as category_rank
+        FROM sales
+    )
+    SELECT ?, '', overall_rank, id, name, brand, category, retail_price, sales_count
+    FROM ranked WHERE overall_rank <= ?
+    UNION ALL
+    SELECT ?, category, category_rank, id, name, brand, category, retail_price, sales_count
+    FROM ranked WHERE category IS NOT NULL AND category_rank <= ?
+"""
+
+POPULAR_PRODUCTS_QUERY = """
+    SELECT id, name, brand, category, retail_price, sales_count
+    FROM product_popularity
+    WHERE period = ? AND scope = ?
+    ORDER BY rank
+    LIMIT ?
+"""
+
+# Stay well under SQLite's bound-parameter limit for IN (...) lists
+MAX_IN_PARAMS = 500
+
+# BM25 column weights follow the products_fts column order: name, brand, category, department
+PRODUCT_SEARCH_QUERY = """
+    SELECT p.id, p.name, p.brand, p.category, p.department, p.retail_price, p.cost
+    FROM products_fts
+    JOIN products p ON p.rowid = products_fts.rowid
+    WHERE products_fts MATCH ?
+    ORDER BY bm25(products_fts, 10.0, 5.0, 3.0, 1.0)
+    LIMIT ?
+"""
+
+# Indexes created after every ingestion: name -> (table, columns).
+# Trailing columns make the lookups covering where the query allows it.
+CATALOG_INDEXES = {
+    'idx_products_id': ('products', ['id']),
+    'idx_distribution_centers_id': ('distribution_centers', ['id']),
+    'idx_orders_user_id_created_at': ('orders', ['user_id', 'created_at']),
+    'idx_order_items_order_id': ('order_items', ['order_id', 'id']),
+    'idx_order_items_product_id': ('order_items', ['product_id', 'id']),
+    'idx_inventory_items_product_id': ('inventory_items', ['product_id', 'sold_at']),
+}
+
+class SQLiteConnectionPool:
+    """Fixed-size pool of read-only SQLite connections shared across threads.
+
+    Each connection keeps its own prepared statement cache, so the catalog
+    queries are compiled once per connection rather than once per call.
+    """
+    
+    def __init__(self, db_path: str, size: int = 5, timeout: float = 30.0,
+                 cached_statements: int = 256):
+        self.db_uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        self.size = size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._connections = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._connections.put(self._connect())
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(
+            self.db_uri,
+            uri=True,
+            check_same_thread=False,
+            timeout=self.timeout,
+            cached_statements=self.cached_statements
+        )
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, blocking until one is free"""
+        try:
+            conn = self._connections.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection available after {self.timeout}s")
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+    
+    def close(self):
+        """Close every pooled connection"""
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except queue.Empty:
+                break
+
 class DatabaseManager:
-    def __init__(self, db_path: str = "ecommerce.db"):
+    CSV_FILES = [
+        'distribution_centers.csv',
+        'products.csv', 
+        'users.csv',
+        'orders.csv',
+        'order_items.csv',
+        'inventory_items.csv'
+    ]
+    
+    def __init__(self, db_path: str = "ecommerce.db", pool_size: int = 5,
+                 ingestion_mode: str = "incremental", chunk_size: int = 50000,
+                 cache: CacheBackend = None):
+        """
+        ingestion_mode is "incremental" (keep the database across restarts and
+        only reload CSVs that changed) or "replace" (reload every CSV).
+        
+        cache is the backend for catalog caching. Reloads are announced on its
+        CATALOG_CHANNEL, so workers sharing a backend and a database file
+        pick up each other's catalog version.
+        """
+        if ingestion_mode not in ("incremental", "replace"):
+            raise ValueError(f"Unknown ingestion mode: {ingestion_mode}")
+        
         self.db_path = db_path
-        self.conn = None
+        self.pool_size = pool_size
+        self.ingestion_mode = ingestion_mode
+        self.chunk_size = chunk_size
+        self.conn = None  # Writer connection, used for ingestion only
+        self.pool = None
+        # Fingerprint of the loaded CSVs; changes whenever catalog tables are reloaded
+        self.catalog_version = None
+        self.cache = cache or InProcessBackend()
+        self.cache.subscribe(CATALOG_CHANNEL, self._on_catalog_reloaded)
         self.init_database()
     
     def init_database(self):
         """Initialize the database and load CSV data"""
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # WAL lets pooled readers run concurrently with each other and with ingestion
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS _ingestion_state (
+                    file_name TEXT PRIMARY KEY,
+                    table_name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    loaded_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            self.conn.commit()
             self.load_csv_data()
+            self.pool = SQLiteConnectionPool(self.db_path, size=self.pool_size)
             logger.info("Database initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing database: {e}")
             raise
     
-    def load_csv_data(self):
-        """Load CSV files into SQLite database"""
-        csv_files = [
-            'distribution_centers.csv',
-            'products.csv', 
-            'users.csv',
-            'orders.csv',
-            'order_items.csv',
-            'inventory_items.csv'
-        ]
-        
-        for csv_file in csv_files:
+    def load_csv_data(self, force: bool = False) -> List[str]:
+        """Load CSV files into SQLite database
+        
+        In incremental mode a file is skipped when its size and mtime, or
+        failing that its SHA-256, match the last successful load.
+        
+        Returns:
+            Names of the tables that were (re)loaded
+        """
+        force = force or self.ingestion_mode == "replace"
+        loaded_tables = []
+        
+        for csv_file in self.CSV_FILES:
             if os.path.exists(csv_file):
                 try:
-                    df = pd.read_csv(csv_file)
                     table_name = csv_file.replace('.csv', '')
-                    df.to_sql(table_name, self.conn, if_exists='replace', index=False)
-                    logger.info(f"Loaded {csv_file} into {table_name} table")
+                    if self._load_csv_file(csv_file, table_name, force):
+                        loaded_tables.append(table_name)
                 except Exception as e:
                     logger.error(f"Error loading {csv_file}: {e}")
+        
+        self._refresh_derived_tables(loaded_tables)
+        self.catalog_version = self._compute_catalog_version()
+        if loaded_tables:
+            self.cache.publish(CATALOG_CHANNEL, {
+                'catalog_version': self.catalog_version,
+                'tables': loaded_tables
+            })
+        return loaded_tables
+    
+    def _catalog_cache_key(self, name: str, args: tuple = (), kwargs: Dict[str, Any] = None) -> str:
+        params = json.dumps([args, sorted((kwargs or {}).items())], default=str)
+        return f"catalog:{self.catalog_version}:{name}:{params}"
+    
+    def _on_catalog_reloaded(self, message: Dict[str, Any]):
+        """Adopt the catalog version announced by the worker that reloaded the CSVs"""
+        version = message.get('catalog_version')
+        if version and version != self.catalog_version:
+            logger.info(f"Catalog reloaded elsewhere ({', '.join(message.get('tables', []))}), "
+                        f"now at version {version}")
+            self.catalog_version = version
+    
+    def _refresh_derived_tables(self, loaded_tables: List[str]):
+        """Bring indexes and tables derived from the catalog in line with the loaded CSVs"""
+        self.ensure_indexes(analyze_tables=loaded_tables)
+        
+        if 'products' in loaded_tables or not self._table_exists('products_fts'):
+            try:
+                self.rebuild_search_index()
+            except sqlite3.Error as e:
+                logger.error(f"Error building product search index: {e}")
+        
+        if 'inventory_items' in loaded_tables or not self._table_exists('inventory_summary'):
+            try:
+                self.rebuild_inventory_summary()
+            except sqlite3.Error as e:
+                logger.error(f"Error building inventory summary: {e}")
+        
+        if ({'products', 'order_items'} & set(loaded_tables)
+                or not self._table_exists('product_popularity')):
+            try:
+                self.rebuild_product_popularity()
+            except sqlite3.Error as e:
+                logger.error(f"Error building product popularity: {e}")
+    
+    def _table_exists(self, table_name: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", [table_name]
+        ).fetchone() is not None
+    
+    def ensure_indexes(self, analyze_tables: List[str] = None):
+        """Create the catalog indexes that are missing and refresh planner statistics
+        
+        Reloading a table drops its indexes, so this runs after every ingestion.
+        """
+        existing_columns = {}
+        for table_name, _ in CATALOG_INDEXES.values():
+            if table_name not in existing_columns:
+                rows = self.conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()
+                existing_columns[table_name] = {row[1] for row in rows}
+        
+        for index_name, (table_name, columns) in CATALOG_INDEXES.items():
+            missing = [column for column in columns if column not in existing_columns[table_name]]
+            if missing:
+                if existing_columns[table_name]:
+                    logger.warning(f"Skipping index {index_name}: {table_name} has no column(s) {missing}")
+                continue
+            column_list = ", ".join(f'"{column}"' for column in columns)
+            try:
+                self.conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({column_list})'
+                )
+            except sqlite3.Error as e:
+                logger.error(f"Error creating index {index_name}: {e}")
+        
+        for table_name in analyze_tables or []:
+            self.conn.execute(f'ANALYZE "{table_name}"')
+        self.conn.commit()
+    
+    def rebuild_search_index(self):
+        """Rebuild the FTS5 product index from the products table in one transaction"""
+        if not self._table_exists('products'):
+            return
+        
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            conn.execute("DROP TABLE IF EXISTS products_fts")
+            conn.execute("""
+                CREATE VIRTUAL TABLE products_fts USING fts5(
+                    name, brand, category, department,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                )
+            """)
+            # rowid mirrors products.rowid so matches join straight back to the catalog
+            conn.execute("""
+                INSERT INTO products_fts (rowid, name, brand, category, department)
+                SELECT rowid, name, brand, category, department FROM products
+            """)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info("Rebuilt product search index")
+    
+    def rebuild_inventory_summary(self):
+        """Materialize total/available/sold counts per product into inventory_summary"""
+        if not self._table_exists('inventory_items'):
+            return
+        
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            conn.execute("DROP TABLE IF EXISTS inventory_summary")
+            conn.execute("""
+                CREATE TABLE inventory_summary (
+                    product_id INTEGER PRIMARY KEY,
+                    total_items INTEGER NOT NULL,
+                    available_items INTEGER NOT NULL,
+                    sold_items INTEGER NOT NULL
+                )
+            """)
+            conn.execute("INSERT INTO inventory_summary " + INVENTORY_AGGREGATE_QUERY)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info("Rebuilt inventory summary")
+    
+    def rebuild_product_popularity(self, top_k: int = POPULARITY_TOP_K):
+        """Materialize the top_k products by sales per window, overall and per category"""
+        if not (self._table_exists('order_items') and self._table_exists('products')):
+            return
+        
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            conn.execute("DROP TABLE IF EXISTS product_popularity")
+            conn.execute("""
+                CREATE TABLE product_popularity (
+                    period TEXT NOT NULL,
+                    scope TEXT NOT NULL,
+                    rank INTEGER NOT NULL,
+                    id INTEGER NOT NULL,
+                    name TEXT,
+                    brand TEXT,
+                    category TEXT,
+                    retail_price REAL,
+                    sales_count INTEGER NOT NULL,
+                    PRIMARY KEY (period, scope, rank)
+                ) WITHOUT ROWID
+            """)
+            for period, days in POPULARITY_WINDOWS.items():
+                modifier = f"-{days} days" if days is not None else None
+                conn.execute(
+                    "INSERT INTO product_popularity " + POPULARITY_RANK_QUERY,
+                    [modifier, modifier, period, top_k, period, top_k]
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info("Rebuilt product popularity rankings")
+    
+    def explain_query_plans(self) -> Dict[str, Any]:
+        """Return the EXPLAIN QUERY PLAN output for the hot catalog queries"""
+        queries = {
+            'get_product_by_id': (PRODUCT_BY_ID_QUERY, [1]),
+            'get_user_orders': (USER_ORDERS_QUERY, [1]),
+            'get_order_details': (ORDER_DETAILS_QUERY, [1]),
+            'get_inventory_status': (INVENTORY_STATUS_QUERY, [1]),
+            'get_popular_products': (POPULAR_PRODUCTS_QUERY, ['all', '', 10])
+        }
+        
+        plans = {}
+        with self.pool.connection() as conn:
+            for name, (query, params) in queries.items():
+                try:
+                    rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+                    plans[name] = [row[3] for row in rows]
+                except sqlite3.Error as e:
+                    plans[name] = [f"error: {e}"]
+            indexes = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%' ORDER BY name"
+            )]
+        
+        return {'indexes': indexes, 'plans': plans}
+    
+    def _load_csv_file(self, csv_file: str, table_name: str, force: bool) -> bool:
+        """Load one CSV into its table unless it is unchanged. Returns True if loaded."""
+        stat = os.stat(csv_file)
+        state = self.conn.execute(
+            "SELECT size, mtime_ns, sha256 FROM _ingestion_state WHERE file_name = ?",
+            [csv_file]
+        ).fetchone()
+        table_exists = self._table_exists(table_name)
+        
+        if not force and state and table_exists:
+            if state[0] == stat.st_size and state[1] == stat.st_mtime_ns:
+                logger.info(f"{csv_file} unchanged, skipping")
+                return False
+            
+            digest = self._hash_file(csv_file)
+            if state[2] == digest:
+                # Touched but identical content: remember the new mtime and move on
+                self.conn.execute(
+                    "UPDATE _ingestion_state SET size = ?, mtime_ns = ? WHERE file_name = ?",
+                    [stat.st_size, stat.st_mtime_ns, csv_file]
+                )
+                self.conn.commit()
+                logger.info(f"{csv_file} content unchanged, skipping")
+                return False
+        else:
+            digest = self._hash_file(csv_file)
+        
+        # Replace the table chunk by chunk inside one transaction so readers
+        # never observe a partially loaded table
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+            row_count = 0
+            insert_sql = None
+            for chunk in pd.read_csv(csv_file, chunksize=self.chunk_size):
+                if insert_sql is None:
+                    conn.execute(pd.io.sql.get_schema(chunk, table_name, con=conn))
+                    columns = ", ".join(f'"{column}"' for column in chunk.columns)
+                    placeholders = ", ".join("?" * len(chunk.columns))
+                    insert_sql = f'INSERT INTO "{table_name}" ({columns}) VALUES ({placeholders})'
+                # object dtype turns numpy scalars into plain Python values sqlite3 can bind
+                records = chunk.astype(object).where(chunk.notna(), None)
+                conn.executemany(insert_sql, records.itertuples(index=False, name=None))
+                row_count += len(chunk)
+            
+            if insert_sql is None:
+                # Header-only file: still create the (empty) table
+                header = pd.read_csv(csv_file, nrows=0)
+                conn.execute(pd.io.sql.get_schema(header, table_name, con=conn))
+            
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO _ingestion_state
+                    (file_name, table_name, size, mtime_ns, sha256, row_count, loaded_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                [csv_file, table_name, stat.st_size, stat.st_mtime_ns, digest, row_count]
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        logger.info(f"Loaded {csv_file} into {table_name} table ({row_count} rows)")
+        return True
+    
+    def _hash_file(self, path: str) -> str:
+        """SHA-256 of a file, read in 1 MiB blocks"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _compute_catalog_version(self) -> str:
+        """Derive the catalog version from the hashes of the loaded files"""
+        rows = self.conn.execute(
+            "SELECT file_name, sha256 FROM _ingestion_state ORDER BY file_name"
+        ).fetchall()
+        digest = hashlib.sha256()
+        for file_name, sha256 in rows:
+            digest.update(f"{file_name}:{sha256};".encode())
+        return digest.hexdigest()[:16]
+    
+    def _fetch_all(self, query: str, params: List[Any] = ()) -> List[Dict[str, Any]]:
+        """Run a read query on a pooled connection and map rows to plain dicts
+        
+        Request-path reads go through here rather than pandas: no DataFrame is
+        built per call and values stay native Python types (None, int, float, str).
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
     
+    def _fetch_one(self, query: str, params: List[Any] = ()) -> Optional[Dict[str, Any]]:
+        """Like _fetch_all, for queries that return at most one row"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(query, params)
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip([column[0] for column in cursor.description], row))
+    
+    @catalog_cached
     def get_products(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Get products with basic information"""
         query = """
@@ -51,106 +574,134 @@ class DatabaseManager:
         FROM products 
         LIMIT ?
         """
-        df = pd.read_sql_query(query, self.conn, params=[limit])
-        return df.to_dict('records')
+        return self._fetch_all(query, [limit])
+    
+    def get_product_names(self) -> List[tuple]:
+        """Get (id, name) pairs for every product, in table order"""
+        query = "SELECT id, name FROM products WHERE name IS NOT NULL"
+        with self.pool.connection() as conn:
+            return conn.execute(query).fetchall()
     
     def search_products(self, search_term: str, limit: int = 20) -> List[Dict[str, Any]]:
-        """Search products by name, brand, or category"""
+        """Search products by name, brand, category or department, best matches first
+        
+        Terms are ANDed and prefix-matched; "OR" between terms gives alternatives,
+        e.g. "levi jea" or "jeans OR shorts".
+        """
+        match_expression = self._build_match_expression(search_term)
+        if match_expression is not None:
+            try:
+                return self._fetch_all(PRODUCT_SEARCH_QUERY, [match_expression, limit])
+            except sqlite3.Error as e:
+                # FTS5 missing from this SQLite build, or the index isn't built yet
+                logger.warning(f"Full-text search unavailable, falling back to LIKE: {e}")
+        
         query = """
         SELECT id, name, brand, category, department, retail_price, cost
         FROM products 
         WHERE LOWER(name) LIKE LOWER(?) 
            OR LOWER(brand) LIKE LOWER(?) 
            OR LOWER(category) LIKE LOWER(?)
+           OR LOWER(department) LIKE LOWER(?)
         LIMIT ?
         """
         search_pattern = f"%{search_term}%"
-        df = pd.read_sql_query(query, self.conn, params=[search_pattern, search_pattern, search_pattern, limit])
-        return df.to_dict('records')
+        return self._fetch_all(query, [search_pattern] * 4 + [limit])
+    
+    def _build_match_expression(self, search_term: str) -> Optional[str]:
+        """Turn free text into an FTS5 MATCH expression of prefix terms"""
+        groups = [[]]
+        for token in re.findall(r'\w+', search_term.lower()):
+            if token == 'or':
+                groups.append([])
+            elif token != 'and':
+                # Quoting keeps FTS5 keywords and column names literal
+                groups[-1].append(f'"{token}"*')
+        
+        clauses = [" AND ".join(terms) for terms in groups if terms]
+        if not clauses:
+            return None
+        if len(clauses) == 1:
+            return clauses[0]
+        return " OR ".join(f"({clause})" for clause in clauses)
     
+    @catalog_cached
     def get_product_by_id(self, product_id: int) -> Dict[str, Any]:
         """Get detailed product information by ID"""
-        query = """
-        SELECT p.*, dc.name as distribution_center_name
-        FROM products p
-        LEFT JOIN distribution_centers dc ON p.distribution_center_id = dc.id
-        WHERE p.id = ?
-        """
-        df = pd.read_sql_query(query, self.conn, params=[product_id])
-        if not df.empty:
-            return df.iloc[0].to_dict()
-        return {}
+        return self._fetch_one(PRODUCT_BY_ID_QUERY, [product_id]) or {}
     
     def get_user_orders(self, user_id: int) -> List[Dict[str, Any]]:
         """Get orders for a specific user"""
-        query = """
-        SELECT o.*, COUNT(oi.id) as item_count
-        FROM orders o
-        LEFT JOIN order_items oi ON o.order_id = oi.order_id
-        WHERE o.user_id = ?
-        GROUP BY o.order_id
-        ORDER BY o.created_at DESC
-        """
-        df = pd.read_sql_query(query, self.conn, params=[user_id])
-        return df.to_dict('records')
+        return self._fetch_all(USER_ORDERS_QUERY, [user_id])
     
     def get_order_details(self, order_id: int) -> List[Dict[str, Any]]:
         """Get detailed order items for an order"""
-        query = """
-        SELECT oi.*, p.name as product_name, p.brand, p.category
-        FROM order_items oi
-        JOIN products p ON oi.product_id = p.id
-        WHERE oi.order_id = ?
-        """
-        df = pd.read_sql_query(query, self.conn, params=[order_id])
-        return df.to_dict('records')
+        return self._fetch_all(ORDER_DETAILS_QUERY, [order_id])
     
+    @catalog_cached
     def get_inventory_status(self, product_id: int) -> Dict[str, Any]:
         """Get inventory status for a product"""
-        query = """
-        SELECT 
-            COUNT(*) as total_items,
-            COUNT(CASE WHEN sold_at IS NULL THEN 1 END) as available_items,
-            COUNT(CASE WHEN sold_at IS NOT NULL THEN 1 END) as sold_items
-        FROM inventory_items
-        WHERE product_id = ?
-        """
-        df = pd.read_sql_query(query, self.conn, params=[product_id])
-        if not df.empty:
-            return df.iloc[0].to_dict()
+        status = self._fetch_one(INVENTORY_STATUS_QUERY, [product_id])
+        if status:
+            return status
         return {"total_items": 0, "available_items": 0, "sold_items": 0}
     
-    def get_popular_products(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get most popular products based on sales"""
-        query = """
-        SELECT 
-            p.id, p.name, p.brand, p.category, p.retail_price,
-            COUNT(oi.id) as sales_count
-        FROM products p
-        JOIN order_items oi ON p.id = oi.product_id
-        GROUP BY p.id
-        ORDER BY sales_count DESC
-        LIMIT ?
+    def get_inventory_status_many(self, product_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get inventory status for several products in one query, keyed by product ID"""
+        statuses = {
+            product_id: {"total_items": 0, "available_items": 0, "sold_items": 0}
+            for product_id in product_ids
+        }
+        unique_ids = list(statuses)
+        
+        for start in range(0, len(unique_ids), MAX_IN_PARAMS):
+            batch = unique_ids[start:start + MAX_IN_PARAMS]
+            placeholders = ", ".join("?" * len(batch))
+            query = f"""
+            SELECT product_id, total_items, available_items, sold_items
+            FROM inventory_summary
+            WHERE product_id IN ({placeholders})
+            """
+            for record in self._fetch_all(query, batch):
+                statuses[record.pop('product_id')] = record
+        
+        return statuses
+    
+    @catalog_cached
+    def get_popular_products(self, limit: int = 10, window: str = 'all',
+                             category: str = None) -> List[Dict[str, Any]]:
+        """Get most popular products based on sales
+        
+        Reads the precomputed rankings, so at most POPULARITY_TOP_K products
+        are available per window and category. window is a key of
+        POPULARITY_WINDOWS; category restricts the ranking to one category.
         """
-        df = pd.read_sql_query(query, self.conn, params=[limit])
-        return df.to_dict('records')
+        if window not in POPULARITY_WINDOWS:
+            raise ValueError(f"Unknown popularity window: {window}")
+        return self._fetch_all(POPULAR_PRODUCTS_QUERY, [window, category or '', limit])
     
+    @catalog_cached
     def get_categories(self) -> List[str]:
         """Get all product categories"""
         query = "SELECT DISTINCT category FROM products WHERE category IS NOT NULL"
-        df = pd.read_sql_query(query, self.conn)
-        return df['category'].tolist()
+        return [row['category'] for row in self._fetch_all(query)]
     
+    @catalog_cached
     def get_brands(self) -> List[str]:
         """Get all product brands"""
         query = "SELECT DISTINCT brand FROM products WHERE brand IS NOT NULL"
-        df = pd.read_sql_query(query, self.conn)
-        return df['brand'].tolist()
+        return [row['brand'] for row in self._fetch_all(query)]
     
     def close(self):
-        """Close database connection"""
+        """Close database connections"""
+        if self.pool:
+            self.pool.close()
         if self.conn:
             self.conn.close()
 
 # Global database instance
-db_manager = DatabaseManager() 
\ No newline at end of file
+db_manager = DatabaseManager(
+    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    ingestion_mode=os.getenv("CATALOG_INGESTION_MODE", "incremental"),
+    cache=get_cache_backend()
+)
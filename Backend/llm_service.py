@@ -1,31 +1,241 @@
 import os
+import re
 import json
+import time
+import random
+import hashlib
+import asyncio
 import logging
-import requests
-from typing import Dict, List, Optional, Tuple
+import httpx
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime
+from response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
+# Upstream statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class CircuitBreaker:
+    """Stops calling the LLM after repeated upstream failures
+    
+    After failure_threshold consecutive failures the circuit opens and calls
+    are short-circuited for reset_timeout seconds. The next call after that
+    is a trial: success closes the circuit, failure re-opens it.
+    """
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_count = 0
+        self.opened_at: Optional[float] = None
+    
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+    
+    def allow_request(self) -> bool:
+        """Whether a call may go upstream now"""
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            # Half-open: let one trial through and hold the rest until it reports back
+            self.opened_at = time.monotonic()
+            return True
+        return False
+    
+    def record_success(self):
+        self.failure_count = 0
+        self.opened_at = None
+    
+    def record_failure(self):
+        self.failure_count += 1
+        if self.failure_count >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"LLM circuit opened after {self.failure_count} consecutive failures")
+            self.opened_at = time.monotonic()
+
+# Instructions shared by every turn. Kept ahead of the per-turn context so the
+# prompt prefix is identical across requests.
+SYSTEM_PROMPT_INSTRUCTIONS = """You are an intelligent e-commerce customer support assistant. You help customers with product searches, order tracking, inventory queries, and general support.
+
+Your capabilities:
+1. Product Search: Help customers find products by category, brand, or description
+2. Inventory Queries: Provide stock information and availability
+3. Order Tracking: Help track orders and provide status updates
+4. Return Policy: Explain return and refund policies
+5. Shipping Information: Provide delivery and shipping details
+6. General Support: Answer customer service questions
+
+Guidelines:
+- Be helpful, friendly, and professional
+- If you need more information to help the customer, ask clarifying questions
+- Provide specific, actionable information when possible
+- If you don't have enough information, ask for clarification
+- Keep responses concise but informative
+- Always maintain a helpful and positive tone
+
+If you need to ask clarifying questions, start your response with "I'd be happy to help! To provide you with the best assistance, I need a bit more information:" followed by your specific questions."""
+
+SUMMARY_INSTRUCTIONS = """You maintain a running summary of a customer support conversation for an e-commerce clothing store. Merge the new messages into the existing summary. Keep the products, order IDs, preferences and open questions the customer mentioned, and what the assistant already answered. Write at most 120 words of plain prose, with no preamble."""
+
+class ContextBuilder:
+    """Assembles chat completion messages within a token budget
+    
+    Tokens are estimated at roughly four characters each, which is close
+    enough for English text under the Llama 3 tokenizer. The system prompt
+    and the current user message are always sent; earlier turns are added
+    newest first until the budget runs out, and older ones are dropped.
+    Any single message longer than max_message_tokens is truncated.
+    """
+    
+    CHARS_PER_TOKEN = 4
+    MESSAGE_OVERHEAD_TOKENS = 4  # Role and separator tokens per chat message
+    TRUNCATION_MARKER = " [...] "
+    
+    def __init__(self, token_budget: int = 3000, max_history_messages: int = 10,
+                 max_message_tokens: int = 600, max_database_context_tokens: int = 800,
+                 max_summary_tokens: int = 300):
+        self.token_budget = token_budget
+        self.max_history_messages = max_history_messages
+        self.max_message_tokens = max_message_tokens
+        self.max_database_context_tokens = max_database_context_tokens
+        self.max_summary_tokens = max_summary_tokens
+    
+    def estimate_tokens(self, text: str) -> int:
+        return -(-len(text or "") // self.CHARS_PER_TOKEN)
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Shorten text to about max_tokens, keeping its start and end"""
+        max_chars = max_tokens * self.CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        head = (max_chars - len(self.TRUNCATION_MARKER)) * 2 // 3
+        tail = max_chars - len(self.TRUNCATION_MARKER) - head
+        return text[:head] + self.TRUNCATION_MARKER + (text[-tail:] if tail > 0 else "")
+    
+    def message_tokens(self, message: Dict) -> int:
+        return self.estimate_tokens(message["content"]) + self.MESSAGE_OVERHEAD_TOKENS
+    
+    def build(self, system_prompt: str, conversation_history: List[Dict], user_message: str) -> List[Dict]:
+        system = {"role": "system", "content": system_prompt}
+        user = {"role": "user", "content": self.truncate(user_message, self.max_message_tokens)}
+        remaining = self.token_budget - self.message_tokens(system) - self.message_tokens(user)
+        
+        history = []
+        for msg in reversed(conversation_history[-self.max_history_messages:]):
+            turn = {"role": msg["role"], "content": self.truncate(msg["content"], self.max_message_tokens)}
+            cost = self.message_tokens(turn)
+            if cost > remaining:
+                break
+            history.append(turn)
+            remaining -= cost
+        history.reverse()
+        
+        dropped = len(conversation_history) - len(history)
+        if dropped:
+            logger.debug(f"Context budget left out {dropped} earlier messages")
+        return [system] + history + [user]
+
 class LLMService:
-    def __init__(self, api_key: str = None, base_url: str = "https://api.groq.com/openai/v1"):
-        """Initialize the LLM service with Groq API"""
+    def __init__(self, api_key: str = None, base_url: str = None,
+                 timeout: float = 30.0, connect_timeout: float = 5.0,
+                 max_connections: int = 20, max_keepalive_connections: int = 10,
+                 max_retries: int = 2, backoff_base: float = 0.5, backoff_max: float = 4.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 response_cache: ResponseCache = None, context_builder: ContextBuilder = None):
+        """Initialize the LLM service with Groq API
+        
+        base_url defaults to GROQ_BASE_URL, then the public Groq endpoint, so
+        the service can be pointed at a local stub server.
+        """
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
-        self.base_url = base_url
+        self.base_url = base_url or os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
         self.model = "llama3-8b-8192"  # Fast and cost-effective model
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.circuit_breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.response_cache = response_cache
+        self.context_builder = context_builder or ContextBuilder()
+        # Single-flight: identical in-flight requests share one upstream call
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.coalesced_requests = 0
+        self._client: Optional[httpx.AsyncClient] = None
         
         if not self.api_key:
             logger.warning("No Groq API key provided. LLM features will be disabled.")
     
-    def _make_request(self, messages: List[Dict], temperature: float = 0.7) -> Optional[str]:
-        """Make a request to the Groq API"""
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the pooled keep-alive HTTP client, creating it on first use"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                }
+            )
+        return self._client
+    
+    async def close(self):
+        """Close the HTTP client and its connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Full-jitter exponential backoff, honouring a numeric Retry-After header"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    async def _make_request(self, messages: List[Dict], temperature: float = 0.7) -> Optional[str]:
+        """Make a request to the Groq API, coalescing identical concurrent requests
+        
+        While a request for the same model, messages and temperature is in
+        flight, later callers await its result instead of calling upstream
+        again. The shared call runs as its own task, so a caller that is
+        cancelled (e.g. the client disconnected) does not cancel it for the rest.
+        """
+        key = hashlib.sha256(json.dumps(
+            {"model": self.model, "messages": messages, "temperature": temperature},
+            sort_keys=True
+        ).encode()).hexdigest()
+        
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._request_upstream(messages, temperature))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced_requests += 1
+        
+        return await asyncio.shield(task)
+    
+    async def _request_upstream(self, messages: List[Dict], temperature: float = 0.7) -> Optional[str]:
+        """Send one completion request to the Groq API
+        
+        Retries 429/5xx responses and transport errors with jittered backoff.
+        Returns None when the call fails or the circuit is open, which sends
+        callers to _fallback_response.
+        """
         if not self.api_key:
             return None
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        if not self.circuit_breaker.allow_request():
+            logger.warning("LLM circuit open, skipping Groq API call")
+            return None
         
         data = {
             "model": self.model,
@@ -34,91 +244,244 @@ class LLMService:
             "max_tokens": 1000
         }
         
-        try:
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
-            else:
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = await self._get_client().post("/chat/completions", json=data)
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    self.circuit_breaker.record_success()
+                    return result["choices"][0]["message"]["content"]
+                
                 logger.error(f"Groq API error: {response.status_code} - {response.text}")
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return None
+                    
+            except httpx.TransportError as e:
+                logger.error(f"Error calling Groq API: {e}")
+            except Exception as e:
+                logger.error(f"Error calling Groq API: {e}")
                 return None
-                
-        except Exception as e:
-            logger.error(f"Error calling Groq API: {e}")
-            return None
+            
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._retry_delay(attempt, response))
+        
+        self.circuit_breaker.record_failure()
+        return None
+    
+    async def _stream_request(self, messages: List[Dict], temperature: float = 0.7) -> AsyncIterator[str]:
+        """Stream a completion from the Groq API, yielding content deltas
+        
+        Uses the OpenAI-compatible ``stream: true`` mode. Failures before the
+        first token are retried like _make_request; once tokens have been
+        yielded an error simply ends the stream.
+        """
+        if not self.api_key:
+            return
+        
+        if not self.circuit_breaker.allow_request():
+            logger.warning("LLM circuit open, skipping Groq API call")
+            return
+        
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": 1000,
+            "stream": True
+        }
+        
+        for attempt in range(self.max_retries + 1):
+            response = None
+            received = False
+            try:
+                async with self._get_client().stream("POST", "/chat/completions", json=data) as response:
+                    if response.status_code == 200:
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            payload = line[len("data:"):].strip()
+                            if payload == "[DONE]":
+                                break
+                            delta = json.loads(payload)["choices"][0].get("delta", {}).get("content")
+                            if delta:
+                                received = True
+                                yield delta
+                        self.circuit_breaker.record_success()
+                        return
+                    
+                    await response.aread()
+                    logger.error(f"Groq API error: {response.status_code} - {response.text}")
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        return
+                        
+            except httpx.TransportError as e:
+                logger.error(f"Error streaming from Groq API: {e}")
+                if received:
+                    return
+            except Exception as e:
+                logger.error(f"Error streaming from Groq API: {e}")
+                return
+            
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._retry_delay(attempt, response))
+        
+        self.circuit_breaker.record_failure()
+    
+    def _build_messages(self, user_message: str, conversation_history: List[Dict],
+                        intent: str, entities: Dict, database_context: str,
+                        conversation_summary: str = "") -> List[Dict]:
+        """Build the chat completion messages for a user turn"""
+        system_prompt = self._build_system_prompt(intent, entities, database_context, conversation_summary)
+        return self.context_builder.build(system_prompt, conversation_history, user_message)
+    
+    async def _cache_call(self, method, *args):
+        """Run a response cache call on a worker thread
+        
+        A shared backend does blocking network round-trips, which must not
+        stall the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(method, *args))
     
-    def generate_response(self, user_message: str, conversation_history: List[Dict], 
-                         intent: str, entities: Dict, database_context: str = "") -> Tuple[str, bool]:
+    def _prompt_context(self, messages: List[Dict]) -> str:
+        """Everything sent to the LLM besides the user's message, for response cache keys"""
+        return json.dumps(messages[:-1], sort_keys=True)
+    
+    async def generate_response(self, user_message: str, conversation_history: List[Dict], 
+                         intent: str, entities: Dict, database_context: str = "",
+                         conversation_summary: str = "") -> Tuple[str, bool]:
         """
         Generate an intelligent response using the LLM
         
+        conversation_summary stands in for the turns older than conversation_history.
+        
         Returns:
             Tuple of (response_text, needs_clarification)
         """
         if not self.api_key:
             return self._fallback_response(user_message, intent, entities), False
         
-        # Build system prompt
-        system_prompt = self._build_system_prompt(intent, entities, database_context)
+        messages = self._build_messages(
+            user_message, conversation_history, intent, entities, database_context, conversation_summary
+        )
         
-        # Build conversation context
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add conversation history (last 5 messages for context)
-        for msg in conversation_history[-5:]:
-            messages.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
-        
-        # Add current user message
-        messages.append({"role": "user", "content": user_message})
+        # The answer depends on the whole prompt, history and summary included
+        prompt_context = self._prompt_context(messages)
+        cacheable = self.response_cache is not None and self.response_cache.is_cacheable(intent)
+        if cacheable:
+            cached = await self._cache_call(
+                self.response_cache.get, user_message, intent, entities, prompt_context
+            )
+            if cached:
+                return cached
         
         # Generate response
-        response = self._make_request(messages, temperature=0.7)
+        response = await self._make_request(messages, temperature=0.7)
         
         if response:
             # Check if response indicates need for clarification
             needs_clarification = self._check_for_clarification(response)
+            if cacheable:
+                await self._cache_call(
+                    self.response_cache.set,
+                    user_message, intent, entities, prompt_context, response, needs_clarification
+                )
             return response, needs_clarification
         else:
             return self._fallback_response(user_message, intent, entities), False
     
-    def _build_system_prompt(self, intent: str, entities: Dict, database_context: str) -> str:
+    async def stream_response(self, user_message: str, conversation_history: List[Dict],
+                              intent: str, entities: Dict, database_context: str = "",
+                              conversation_summary: str = "") -> AsyncIterator[str]:
+        """
+        Stream a response from the LLM chunk by chunk
+        
+        Yields the fallback response as a single chunk when the LLM is
+        unavailable or fails before producing any text.
+        """
+        received = False
+        if self.api_key:
+            messages = self._build_messages(
+                user_message, conversation_history, intent, entities, database_context, conversation_summary
+            )
+            
+            # Streamed answers are served from the cache but not written to it: a
+            # stream cut short would otherwise leave a truncated answer behind
+            if self.response_cache is not None and self.response_cache.is_cacheable(intent):
+                cached = await self._cache_call(
+                    self.response_cache.get, user_message, intent, entities, self._prompt_context(messages)
+                )
+                if cached:
+                    yield cached[0]
+                    return
+            
+            async for chunk in self._stream_request(messages, temperature=0.7):
+                received = True
+                yield chunk
+        
+        if not received:
+            yield self._fallback_response(user_message, intent, entities)
+    
+    def _build_system_prompt(self, intent: str, entities: Dict, database_context: str,
+                             conversation_summary: str = "") -> str:
         """Build a system prompt for the LLM"""
-        prompt = f"""You are an intelligent e-commerce customer support assistant. You help customers with product searches, order tracking, inventory queries, and general support.
+        database_context = self.context_builder.truncate(
+            database_context, self.context_builder.max_database_context_tokens
+        )
+        prompt = f"""{SYSTEM_PROMPT_INSTRUCTIONS}
 
 Current Context:
 - Detected Intent: {intent}
 - Extracted Entities: {json.dumps(entities) if entities else 'None'}
-- Database Context: {database_context}
-
-Your capabilities:
-1. Product Search: Help customers find products by category, brand, or description
-2. Inventory Queries: Provide stock information and availability
-3. Order Tracking: Help track orders and provide status updates
-4. Return Policy: Explain return and refund policies
-5. Shipping Information: Provide delivery and shipping details
-6. General Support: Answer customer service questions
-
-Guidelines:
-- Be helpful, friendly, and professional
-- If you need more information to help the customer, ask clarifying questions
-- Provide specific, actionable information when possible
-- If you don't have enough information, ask for clarification
-- Keep responses concise but informative
-- Always maintain a helpful and positive tone
-
-If you need to ask clarifying questions, start your response with "I'd be happy to help! To provide you with the best assistance, I need a bit more information:" followed by your specific questions."""
+- Database Context: {database_context}"""
         
+        if conversation_summary:
+            summary = self.context_builder.truncate(conversation_summary, self.context_builder.max_summary_tokens)
+            prompt += f"\n- Earlier Conversation: {summary}"
         return prompt
     
+    async def summarize_conversation(self, previous_summary: str, messages: List[Dict]) -> str:
+        """Fold messages into the rolling summary of a conversation
+        
+        Uses the LLM when available and falls back to an extractive summary of
+        the customer's messages otherwise.
+        """
+        builder = self.context_builder
+        if self.api_key:
+            transcript = "\n".join(
+                f"{msg['role']}: {builder.truncate(msg['content'], builder.max_message_tokens // 2)}"
+                for msg in messages
+            )
+            prompt = [
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                {"role": "user", "content": builder.truncate(
+                    f"Existing summary: {previous_summary or 'None'}\n\nNew messages:\n{transcript}",
+                    builder.token_budget
+                )}
+            ]
+            response = await self._make_request(prompt, temperature=0.2)
+            if response:
+                return builder.truncate(response.strip(), builder.max_summary_tokens)
+        
+        return self._extractive_summary(previous_summary, messages)
+    
+    def _extractive_summary(self, previous_summary: str, messages: List[Dict]) -> str:
+        """Summary built from the first sentence of each customer message"""
+        points = []
+        for msg in messages:
+            if msg['role'] == 'user':
+                sentence = re.split(r'(?<=[.!?])\s', msg['content'].strip(), maxsplit=1)[0]
+                points.append(self.context_builder.truncate(sentence.rstrip('.!?'), 40))
+        
+        summary = previous_summary or ""
+        if points:
+            summary = f"{summary} Customer asked: {'; '.join(points)}.".strip()
+        # Keep the most recent part when the summary outgrows its budget
+        max_chars = self.context_builder.max_summary_tokens * ContextBuilder.CHARS_PER_TOKEN
+        return summary[-max_chars:]
+    
     def _check_for_clarification(self, response: str) -> bool:
         """Check if the response indicates a need for clarification"""
         clarification_indicators = [
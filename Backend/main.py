@@ -1,25 +1,70 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Set
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+import asyncio
+import json
+import os
 import uvicorn
 import logging
 from datetime import datetime
 
-from database import db_manager
+from database import db_manager, POPULARITY_TOP_K, POPULARITY_WINDOWS
 from chatbot import chatbot
+from conversation_cache import ConversationCache
 from conversation_manager import ConversationManager
 from llm_service import LLMService
+from response_cache import ResponseCache
+from cache_backend import get_cache_backend
+from text_preprocessing import get_text_preprocessor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bounded executor for blocking SQLite catalog reads and ML classification, so
+# they never run on the event loop. Sized to the read connection pool by default.
+blocking_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CATALOG_EXECUTOR_WORKERS", str(db_manager.pool_size))),
+    thread_name_prefix="catalog"
+)
+
+async def run_blocking(func: Callable, *args, **kwargs):
+    """Run a blocking call on the bounded executor and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, partial(func, *args, **kwargs))
+
+# Work that outlives its request but can't use the response's background tasks,
+# e.g. storing a stream the client disconnected from. Referenced here until done
+# so the tasks aren't garbage collected, and awaited on shutdown.
+detached_tasks: Set[asyncio.Task] = set()
+
+def run_detached(coroutine):
+    task = asyncio.create_task(coroutine)
+    detached_tasks.add(task)
+    task.add_done_callback(detached_tasks.discard)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if detached_tasks:
+        await asyncio.gather(*detached_tasks, return_exceptions=True)
+    # Release pooled connections on shutdown
+    await llm_service.close()
+    await conversation_manager.close()
+    get_cache_backend().close()
+    blocking_executor.shutdown(wait=False)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="E-commerce Customer Support Chatbot",
     description="AI-powered chatbot for e-commerce clothing store customer support",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -80,10 +125,40 @@ class ConversationSummary(BaseModel):
 class ConversationHistory(BaseModel):
     conversation_id: str
     messages: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+class BatchClassificationRequest(BaseModel):
+    messages: List[str]
+
+class IntentClassification(BaseModel):
+    message: str
+    intent: str
+    confidence: Optional[float] = None
+
+class BatchClassificationResponse(BaseModel):
+    results: List[IntentClassification]
+    count: int
 
 # Initialize services
-conversation_manager = ConversationManager()
-llm_service = LLMService()
+conversation_manager = ConversationManager(
+    # Opt-in: queued messages are lost if the process dies before they are flushed
+    write_behind=os.getenv("CONVERSATION_WRITE_BEHIND", "false").lower() == "true",
+    # Opt-in: the cache is per process and never revalidated, so only enable it
+    # when a conversation's turns always reach the same worker
+    cache=ConversationCache(
+        max_entries=int(os.getenv("CONVERSATION_CACHE_ENTRIES", "1000")),
+        max_bytes=int(os.getenv("CONVERSATION_CACHE_BYTES", str(16 * 1024 * 1024)))
+    ) if os.getenv("CONVERSATION_CACHE", "false").lower() == "true" else None
+)
+llm_service = LLMService(
+    response_cache=ResponseCache(
+        # Near-duplicate matching reuses the intent classifier's TF-IDF space when it is loaded
+        vectorizer=chatbot.vectorizer if chatbot.ml_models_loaded else None,
+        preprocess=get_text_preprocessor().preprocess if chatbot.ml_models_loaded else None,
+        # Shared with the catalog cache, and across workers when CACHE_URL points at Redis
+        backend=get_cache_backend()
+    )
+)
 
 # Health check endpoint
 @app.get("/")
@@ -102,7 +177,7 @@ async def chat_endpoint(chat_message: ChatMessage):
         logger.info(f"Received message from user {chat_message.user_id}: {chat_message.message}")
         
         # Process message through chatbot
-        response = chatbot.process_message(chat_message.message)
+        response = await run_blocking(chatbot.process_message, chat_message.message)
         
         from datetime import datetime
         timestamp = datetime.now().isoformat()
@@ -116,12 +191,28 @@ async def chat_endpoint(chat_message: ChatMessage):
         logger.error(f"Error processing chat message: {e}")
         raise HTTPException(status_code=500, detail="Error processing message")
 
+def catalog_etag(request: Request, response: Response):
+    """Tag a catalog response with the catalog version; answer matching revalidations with 304
+    
+    Catalog responses only change when the CSVs are reloaded, so the
+    catalog version is a valid entity tag for every catalog URL.
+    """
+    etag = f'"{db_manager.catalog_version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison, as If-None-Match requires
+        if "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]:
+            raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
 # Product endpoints
-@app.get("/products", response_model=List[ProductInfo])
+@app.get("/products", response_model=List[ProductInfo], dependencies=[Depends(catalog_etag)])
 async def get_products(limit: int = 100):
     """Get list of products"""
     try:
-        products = db_manager.get_products(limit=limit)
+        products = await run_blocking(db_manager.get_products, limit=limit)
         return [ProductInfo(**product) for product in products]
     except Exception as e:
         logger.error(f"Error fetching products: {e}")
@@ -131,47 +222,59 @@ async def get_products(limit: int = 100):
 async def search_products(query: str, limit: int = 20):
     """Search products by name, brand, or category"""
     try:
-        products = db_manager.search_products(query, limit=limit)
+        products = await run_blocking(db_manager.search_products, query, limit=limit)
         return {"products": products, "query": query, "count": len(products)}
     except Exception as e:
         logger.error(f"Error searching products: {e}")
         raise HTTPException(status_code=500, detail="Error searching products")
 
-@app.get("/products/{product_id}")
+# Declared before /products/{product_id}, which would otherwise capture "popular"
+@app.get("/products/popular", dependencies=[Depends(catalog_etag)])
+async def get_popular_products(limit: int = Query(10, ge=1, le=POPULARITY_TOP_K),
+                               window: str = "all", category: Optional[str] = None):
+    """Get most popular products
+    
+    window is one of 7d, 30d or all (days before the latest order); category
+    restricts the ranking to one product category. Rankings are precomputed
+    for the top POPULARITY_TOP_K products, so limit can't exceed that.
+    """
+    if window not in POPULARITY_WINDOWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"window must be one of: {', '.join(POPULARITY_WINDOWS)}"
+        )
+    try:
+        products = await run_blocking(
+            db_manager.get_popular_products, limit=limit, window=window, category=category
+        )
+        return {"products": products, "count": len(products), "window": window, "category": category}
+    except Exception as e:
+        logger.error(f"Error fetching popular products: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching popular products")
+
+@app.get("/products/{product_id}", dependencies=[Depends(catalog_etag)])
 async def get_product(product_id: int):
     """Get detailed product information"""
     try:
-        product = db_manager.get_product_by_id(product_id)
+        product = await run_blocking(db_manager.get_product_by_id, product_id)
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        # Get inventory status
-        inventory = db_manager.get_inventory_status(product_id)
-        product['inventory'] = inventory
-        
-        return product
+        # Get inventory status; cached catalog reads are shared, so copy before adding to it
+        inventory = await run_blocking(db_manager.get_inventory_status, product_id)
+        return {**product, 'inventory': inventory}
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching product {product_id}: {e}")
         raise HTTPException(status_code=500, detail="Error fetching product")
 
-@app.get("/products/popular")
-async def get_popular_products(limit: int = 10):
-    """Get most popular products"""
-    try:
-        products = db_manager.get_popular_products(limit=limit)
-        return {"products": products, "count": len(products)}
-    except Exception as e:
-        logger.error(f"Error fetching popular products: {e}")
-        raise HTTPException(status_code=500, detail="Error fetching popular products")
-
 # Order endpoints
 @app.get("/orders/user/{user_id}")
 async def get_user_orders(user_id: int):
     """Get orders for a specific user"""
     try:
-        orders = db_manager.get_user_orders(user_id)
+        orders = await run_blocking(db_manager.get_user_orders, user_id)
         return {"orders": orders, "user_id": user_id, "count": len(orders)}
     except Exception as e:
         logger.error(f"Error fetching orders for user {user_id}: {e}")
@@ -181,33 +284,72 @@ async def get_user_orders(user_id: int):
 async def get_order_items(order_id: int):
     """Get items for a specific order"""
     try:
-        items = db_manager.get_order_details(order_id)
+        items = await run_blocking(db_manager.get_order_details, order_id)
         return {"items": items, "order_id": order_id, "count": len(items)}
     except Exception as e:
         logger.error(f"Error fetching order items for order {order_id}: {e}")
         raise HTTPException(status_code=500, detail="Error fetching order items")
 
 # Catalog endpoints
-@app.get("/categories")
+@app.get("/categories", dependencies=[Depends(catalog_etag)])
 async def get_categories():
     """Get all product categories"""
     try:
-        categories = db_manager.get_categories()
+        categories = await run_blocking(db_manager.get_categories)
         return {"categories": categories, "count": len(categories)}
     except Exception as e:
         logger.error(f"Error fetching categories: {e}")
         raise HTTPException(status_code=500, detail="Error fetching categories")
 
-@app.get("/brands")
+@app.get("/brands", dependencies=[Depends(catalog_etag)])
 async def get_brands():
     """Get all product brands"""
     try:
-        brands = db_manager.get_brands()
+        brands = await run_blocking(db_manager.get_brands)
         return {"brands": brands, "count": len(brands)}
     except Exception as e:
         logger.error(f"Error fetching brands: {e}")
         raise HTTPException(status_code=500, detail="Error fetching brands")
 
+# Intent classification endpoints
+@app.post("/api/classify/batch", response_model=BatchClassificationResponse)
+async def classify_batch(batch_request: BatchClassificationRequest):
+    """Classify the intent of many messages in a single model pass"""
+    try:
+        predictions = await run_blocking(chatbot.classify_intents, batch_request.messages)
+        results = [
+            IntentClassification(message=message, intent=intent, confidence=confidence)
+            for message, (intent, confidence) in zip(batch_request.messages, predictions)
+        ]
+        return BatchClassificationResponse(results=results, count=len(results))
+    except Exception as e:
+        logger.error(f"Error classifying message batch: {e}")
+        raise HTTPException(status_code=500, detail="Error classifying messages")
+
+# Diagnostics endpoints
+@app.get("/diagnostics/query-plans")
+async def get_query_plans():
+    """Show the catalog indexes and the query plans chosen for the hot lookups"""
+    try:
+        return await run_blocking(db_manager.explain_query_plans)
+    except Exception as e:
+        logger.error(f"Error explaining query plans: {e}")
+        raise HTTPException(status_code=500, detail="Error explaining query plans")
+
+@app.get("/diagnostics/llm-cache")
+async def get_llm_cache_stats():
+    """Show hit/miss counters for the LLM response cache and request coalescing"""
+    stats = llm_service.response_cache.stats()
+    stats['coalesced_requests'] = llm_service.coalesced_requests
+    return stats
+
+@app.get("/diagnostics/conversation-cache")
+async def get_conversation_cache_stats():
+    """Show hit/miss counters and size of the hot conversation cache"""
+    if conversation_manager.cache is None:
+        return {"enabled": False}
+    return conversation_manager.cache.stats()
+
 # Chatbot info endpoint
 @app.get("/chatbot/capabilities")
 async def get_chatbot_capabilities():
@@ -234,67 +376,141 @@ async def get_chatbot_capabilities():
         ]
     }
 
+# Rolling summaries: once SUMMARY_INTERVAL messages have accumulated beyond the
+# SUMMARY_KEEP_RECENT most recent ones, they are folded into Conversation.summary,
+# which replaces them in the LLM prompt
+SUMMARY_INTERVAL = int(os.getenv("CONVERSATION_SUMMARY_INTERVAL", "6"))
+SUMMARY_KEEP_RECENT = int(os.getenv("CONVERSATION_SUMMARY_KEEP_RECENT", "4"))
+
 # Enhanced Chat API with conversation history and LLM integration
-@app.post("/api/chat", response_model=ConversationResponse)
-async def enhanced_chat_endpoint(chat_request: ConversationRequest):
-    """Enhanced chat endpoint with conversation history and LLM integration"""
+async def prepare_chat_turn(chat_request: ConversationRequest):
+    """Resolve the conversation, history, intent, entities and database context for a chat turn"""
+    # Get or create conversation
+    if chat_request.conversation_id:
+        conversation = await conversation_manager.get_conversation(chat_request.conversation_id)
+        if not conversation:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+    else:
+        conversation = await conversation_manager.create_conversation(chat_request.user_id)
+    
+    # Get the messages not yet covered by the conversation summary
+    conversation_history = await conversation_manager.get_conversation_history(
+        conversation.conversation_id,
+        SUMMARY_INTERVAL + SUMMARY_KEEP_RECENT,
+        after_id=conversation.summarized_until_id
+    )
+    
+    # Process message through chatbot for intent and entities
+    intent = await run_blocking(chatbot.classify_intent, chat_request.message)
+    entities = await run_blocking(chatbot.extract_entities, chat_request.message)
+    
+    # Generate database context for LLM
+    database_context = ""
+    if intent == "product_search":
+        products = await run_blocking(db_manager.search_products, chat_request.message, limit=3)
+        if products:
+            database_context = f"Found {len(products)} products matching the query"
+    elif intent == "inventory" and 'product_id' in entities:
+        # Look up by the recognized product only: catalog reads are cached by their arguments
+        product_id = entities['product_id']
+        inventory = await run_blocking(db_manager.get_inventory_status, product_id)
+        database_context = (
+            f"Product {product_id} has {inventory['available_items']} of "
+            f"{inventory['total_items']} items available"
+        )
+    
+    return conversation, conversation_history, intent, entities, database_context
+
+async def store_chat_turn(conversation_id: str, user_message: str, assistant_message: str,
+                          intent: str, entities: Dict[str, Any]):
+    """Persist the user message and the assistant response of a chat turn
+    
+    Only the user message is stored when assistant_message is empty, e.g. a
+    stream the client left before any text arrived. Runs as a background
+    task after the response has been sent, so errors are logged rather than
+    raised.
+    """
     try:
-        logger.info(f"Received message from user {chat_request.user_id}: {chat_request.message}")
-        
-        # Get or create conversation
-        if chat_request.conversation_id:
-            conversation = conversation_manager.get_conversation(chat_request.conversation_id)
-            if not conversation:
-                raise HTTPException(status_code=404, detail="Conversation not found")
+        if assistant_message:
+            await conversation_manager.append_turn(
+                conversation_id,
+                user_message,
+                assistant_message,
+                intent,
+                None,  # confidence will be calculated by ML model
+                entities
+            )
         else:
-            conversation = conversation_manager.create_conversation(chat_request.user_id)
+            await conversation_manager.add_message(
+                conversation_id, "user", user_message, intent, None, entities
+            )
+    except Exception as e:
+        logger.error(f"Error storing chat turn for conversation {conversation_id}: {e}")
+
+async def persist_chat_turn(conversation_id: str, user_message: str, assistant_message: str,
+                            intent: str, entities: Dict[str, Any]):
+    """Store a chat turn, then refresh the conversation summary"""
+    await store_chat_turn(conversation_id, user_message, assistant_message, intent, entities)
+    await refresh_conversation_summary(conversation_id)
+
+async def refresh_conversation_summary(conversation_id: str):
+    """Fold older messages into the conversation summary once enough have accumulated
+    
+    Runs as a background task after the chat response has been sent.
+    """
+    try:
+        conversation = await conversation_manager.get_conversation(conversation_id)
+        if not conversation:
+            return
         
-        # Get conversation history
-        conversation_history = conversation_manager.get_conversation_history(conversation.conversation_id)
+        pending = await conversation_manager.get_conversation_messages(
+            conversation_id, limit=None, after_id=conversation.summarized_until_id, include_pending=False
+        )
+        if len(pending) < SUMMARY_INTERVAL + SUMMARY_KEEP_RECENT:
+            return
         
-        # Process message through chatbot for intent and entities
-        intent = chatbot.classify_intent(chat_request.message)
-        entities = chatbot.extract_entities(chat_request.message)
+        to_summarize = pending[:-SUMMARY_KEEP_RECENT] if SUMMARY_KEEP_RECENT else pending
+        summary = await llm_service.summarize_conversation(
+            conversation.summary,
+            [{'role': message.role, 'content': message.content} for message in to_summarize]
+        )
+        stored = await conversation_manager.update_conversation_summary(
+            conversation_id, summary, to_summarize[-1].id, conversation.summarized_until_id
+        )
+        if stored:
+            logger.info(f"Summarized {len(to_summarize)} messages of conversation {conversation_id}")
+    except Exception as e:
+        logger.error(f"Error summarizing conversation {conversation_id}: {e}")
+
+def format_sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format one Server-Sent Events message"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@app.post("/api/chat", response_model=ConversationResponse)
+async def enhanced_chat_endpoint(chat_request: ConversationRequest, background_tasks: BackgroundTasks):
+    """Enhanced chat endpoint with conversation history and LLM integration"""
+    try:
+        logger.info(f"Received message from user {chat_request.user_id}: {chat_request.message}")
         
-        # Generate database context for LLM
-        database_context = ""
-        if intent == "product_search":
-            products = db_manager.search_products(chat_request.message, limit=3)
-            if products:
-                database_context = f"Found {len(products)} products matching the query"
-        elif intent == "inventory":
-            inventory = db_manager.get_inventory_status(chat_request.message)
-            if inventory:
-                database_context = f"Found inventory information for {len(inventory)} products"
+        conversation, conversation_history, intent, entities, database_context = \
+            await prepare_chat_turn(chat_request)
         
         # Generate response using LLM
-        llm_response, needs_clarification = llm_service.generate_response(
+        llm_response, needs_clarification = await llm_service.generate_response(
             chat_request.message,
             conversation_history,
             intent,
             entities,
-            database_context
+            database_context,
+            conversation.summary or ""
         )
         
-        # Store user message
-        conversation_manager.add_message(
-            conversation.conversation_id,
-            "user",
-            chat_request.message,
-            intent,
-            None,  # confidence will be calculated by ML model
-            entities
-        )
-        
-        # Store assistant response
-        conversation_manager.add_message(
-            conversation.conversation_id,
-            "assistant",
-            llm_response,
-            intent,
-            None,
-            entities
+        # Persist the turn, then refresh the summary, after the response is sent
+        background_tasks.add_task(
+            store_chat_turn, conversation.conversation_id, chat_request.message, llm_response, intent, entities
         )
+        background_tasks.add_task(refresh_conversation_summary, conversation.conversation_id)
         
         timestamp = datetime.now().isoformat()
         
@@ -310,31 +526,103 @@ async def enhanced_chat_endpoint(chat_request: ConversationRequest):
         logger.error(f"Error processing enhanced chat message: {e}")
         raise HTTPException(status_code=500, detail="Error processing message")
 
+@app.post("/api/chat/stream")
+async def enhanced_chat_stream_endpoint(chat_request: ConversationRequest, background_tasks: BackgroundTasks):
+    """Streaming variant of /api/chat that sends the LLM response as Server-Sent Events
+    
+    Events: ``start`` with the conversation ID, unnamed ``data`` events carrying
+    ``{"token": ...}`` chunks, then ``end``. The assembled response is stored
+    after the stream has finished; if it is cut short by an error or by the
+    client disconnecting, whatever text was sent is stored.
+    """
+    try:
+        logger.info(f"Received streaming message from user {chat_request.user_id}: {chat_request.message}")
+        conversation, conversation_history, intent, entities, database_context = \
+            await prepare_chat_turn(chat_request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error preparing streaming chat message: {e}")
+        raise HTTPException(status_code=500, detail="Error processing message")
+    
+    async def event_stream():
+        chunks = []
+        finished = False
+        try:
+            yield format_sse({"conversation_id": conversation.conversation_id}, event="start")
+            
+            try:
+                async for chunk in llm_service.stream_response(
+                    chat_request.message,
+                    conversation_history,
+                    intent,
+                    entities,
+                    database_context,
+                    conversation.summary or ""
+                ):
+                    chunks.append(chunk)
+                    yield format_sse({"token": chunk})
+            except Exception as e:
+                logger.error(f"Error streaming chat response: {e}")
+                yield format_sse({"detail": "Error processing message"}, event="error")
+                finished = True
+                return
+            
+            yield format_sse({
+                "conversation_id": conversation.conversation_id,
+                "timestamp": datetime.now().isoformat(),
+                "user_id": chat_request.user_id,
+                "needs_clarification": llm_service._check_for_clarification("".join(chunks))
+            }, event="end")
+            finished = True
+        finally:
+            turn = (conversation.conversation_id, chat_request.message, "".join(chunks), intent, entities)
+            if finished:
+                # Background tasks run once the stream completes
+                background_tasks.add_task(persist_chat_turn, *turn)
+            else:
+                # The client disconnected, so the response's background tasks never run
+                run_detached(persist_chat_turn(*turn))
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Keep proxies (nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Conversation management endpoints
 @app.get("/api/conversations/{user_id}", response_model=List[ConversationSummary])
 async def get_user_conversations(user_id: str, limit: int = 10):
     """Get all conversations for a user"""
     try:
-        conversations = conversation_manager.get_user_conversations(user_id, limit)
-        summaries = []
-        for conv in conversations:
-            summary = conversation_manager.get_conversation_summary(conv.conversation_id)
-            if summary:
-                summaries.append(ConversationSummary(**summary))
-        return summaries
+        summaries = await conversation_manager.get_user_conversation_summaries(user_id, limit)
+        return [ConversationSummary(**summary) for summary in summaries]
     except Exception as e:
         logger.error(f"Error fetching user conversations: {e}")
         raise HTTPException(status_code=500, detail="Error fetching conversations")
 
 @app.get("/api/conversations/{conversation_id}/history", response_model=ConversationHistory)
-async def get_conversation_history(conversation_id: str, limit: int = 50):
-    """Get conversation history"""
+async def get_conversation_history(conversation_id: str, limit: int = 50, before: Optional[str] = None):
+    """Get conversation history
+    
+    Returns the newest ``limit`` messages in chronological order. Pass the
+    returned ``next_cursor`` as ``before`` to fetch the next, older page;
+    it is null once the start of the conversation is reached.
+    """
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
     try:
-        messages = conversation_manager.get_conversation_history(conversation_id, limit)
+        messages, next_cursor = await conversation_manager.get_conversation_history_page(
+            conversation_id, limit, before
+        )
         return ConversationHistory(
             conversation_id=conversation_id,
-            messages=messages
+            messages=messages,
+            next_cursor=next_cursor
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching conversation history: {e}")
         raise HTTPException(status_code=500, detail="Error fetching conversation history")
@@ -343,7 +631,7 @@ async def get_conversation_history(conversation_id: str, limit: int = 50):
 async def delete_conversation(conversation_id: str):
     """Delete a conversation"""
     try:
-        success = conversation_manager.delete_conversation(conversation_id)
+        success = await conversation_manager.delete_conversation(conversation_id)
         if not success:
             raise HTTPException(status_code=404, detail="Conversation not found")
         return {"message": "Conversation deleted successfully"}
@@ -355,7 +643,7 @@ async def delete_conversation(conversation_id: str):
 async def close_conversation(conversation_id: str):
     """Close a conversation (mark as inactive)"""
     try:
-        success = conversation_manager.close_conversation(conversation_id)
+        success = await conversation_manager.close_conversation(conversation_id)
         if not success:
             raise HTTPException(status_code=404, detail="Conversation not found")
         return {"message": "Conversation closed successfully"}
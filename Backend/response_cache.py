@@ -0,0 +1,179 @@
+import re
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from scipy import sparse
+from cache_backend import CacheBackend, InProcessBackend
+
+logger = logging.getLogger(__name__)
+
+# Intents whose answers don't depend on live catalog data, mapped to how long
+# (seconds) a cached answer stays valid
+DEFAULT_INTENT_TTLS = {
+    'return_policy': 3600,
+    'shipping': 3600,
+    'help': 3600,
+    'greeting': 600,
+    'goodbye': 600
+}
+
+class ResponseCache:
+    """LRU/TTL cache of LLM responses for near-identical questions
+    
+    Entries are keyed on the normalized message, intent, entities and a hash
+    of the prompt context: the rest of the prompt sent with the message, i.e.
+    system prompt and conversation history. Answers therefore only match the
+    same conversation state and never leak between conversations. Entries
+    are stored in a CacheBackend with the intent's TTL, so workers sharing a
+    backend share answers. When a TF-IDF vectorizer is supplied, a miss on
+    the exact key falls back to the most similar message with the same
+    intent, entities and context that this process has cached, if it clears
+    similarity_threshold. Only intents listed in intent_ttls are cached.
+    
+    get and set are thread-safe, so async callers can run them on worker
+    threads while a shared backend does network I/O.
+    """
+    
+    def __init__(self, max_entries: int = 1024, intent_ttls: Dict[str, float] = None,
+                 vectorizer: Any = None, preprocess: Callable[[str], str] = None,
+                 similarity_threshold: float = 0.9, backend: CacheBackend = None):
+        self.max_entries = max_entries
+        self.intent_ttls = DEFAULT_INTENT_TTLS if intent_ttls is None else intent_ttls
+        self.vectorizer = vectorizer
+        self.preprocess = preprocess or (lambda text: text)
+        self.similarity_threshold = similarity_threshold
+        self.backend = backend or InProcessBackend(max_entries)
+        self._generation = 0  # Part of every backend key; bumped by clear()
+        # Similarity index over the messages this process cached: key -> bucket, LRU order
+        self._index: "OrderedDict[str, str]" = OrderedDict()
+        self._buckets: Dict[str, Dict[str, Any]] = {}  # bucket -> {key: tf-idf vector}
+        self._bucket_matrices: Dict[str, Tuple[list, Any]] = {}  # bucket -> (keys, stacked vectors)
+        self._lock = threading.Lock()  # Guards the similarity index and counters, not backend calls
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+    
+    def is_cacheable(self, intent: str) -> bool:
+        return intent in self.intent_ttls
+    
+    def _normalize(self, message: str) -> str:
+        return " ".join(re.findall(r'[a-z0-9]+', message.lower()))
+    
+    def _bucket(self, intent: str, entities: Dict, prompt_context: str) -> str:
+        context_hash = hashlib.sha256(prompt_context.encode()).hexdigest()
+        return f"{intent}|{json.dumps(entities or {}, sort_keys=True, default=str)}|{context_hash}"
+    
+    def _key(self, message: str, bucket: str) -> str:
+        return hashlib.sha256(f"{self._normalize(message)}|{bucket}".encode()).hexdigest()
+    
+    def _backend_key(self, key: str) -> str:
+        return f"llm_response:{self._generation}:{key}"
+    
+    def _vectorize(self, message: str):
+        if self.vectorizer is None:
+            return None
+        try:
+            return self.vectorizer.transform([self.preprocess(message)])
+        except Exception as e:
+            logger.warning(f"Could not vectorize message for response cache: {e}")
+            return None
+    
+    def _unindex(self, key: str):
+        bucket_name = self._index.pop(key, None)
+        if bucket_name is not None:
+            bucket = self._buckets.get(bucket_name)
+            if bucket is not None and bucket.pop(key, None) is not None:
+                self._bucket_matrices.pop(bucket_name, None)
+                if not bucket:
+                    del self._buckets[bucket_name]
+    
+    def _find_similar(self, vector, bucket: str) -> Optional[str]:
+        """Key of the most similar indexed message in the bucket, if similar enough"""
+        candidates = self._buckets.get(bucket)
+        if vector is None or vector.nnz == 0 or not candidates:
+            return None
+        if bucket not in self._bucket_matrices:
+            self._bucket_matrices[bucket] = (list(candidates), sparse.vstack(list(candidates.values())).tocsr())
+        keys, matrix = self._bucket_matrices[bucket]
+        
+        # TF-IDF rows are L2-normalized, so the dot product is the cosine similarity
+        scores = (matrix @ vector.T).toarray().ravel()
+        best = scores.argmax()
+        if scores[best] >= self.similarity_threshold:
+            return keys[best]
+        return None
+    
+    def get(self, message: str, intent: str, entities: Dict,
+            prompt_context: str = "") -> Optional[Tuple[str, bool]]:
+        """Return (response, needs_clarification) for a cached answer, or None"""
+        if not self.is_cacheable(intent):
+            return None
+        
+        bucket = self._bucket(intent, entities, prompt_context)
+        key = self._key(message, bucket)
+        entry = self.backend.get(self._backend_key(key))
+        similar = False
+        if entry is None:
+            vector = self._vectorize(message)
+            with self._lock:
+                key = self._find_similar(vector, bucket)
+            if key is not None:
+                entry = self.backend.get(self._backend_key(key))
+                if entry is None:
+                    with self._lock:
+                        self._unindex(key)  # Expired or evicted from the backend
+                similar = entry is not None
+        
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            if key in self._index:
+                self._index.move_to_end(key)
+            self.hits += 1
+            if similar:
+                self.similar_hits += 1
+        response, needs_clarification = entry
+        return response, needs_clarification
+    
+    def set(self, message: str, intent: str, entities: Dict, prompt_context: str,
+            response: str, needs_clarification: bool):
+        """Cache an LLM response if its intent is cacheable"""
+        if not self.is_cacheable(intent):
+            return
+        
+        bucket = self._bucket(intent, entities, prompt_context)
+        key = self._key(message, bucket)
+        self.backend.set(self._backend_key(key), [response, needs_clarification], ttl=self.intent_ttls[intent])
+        
+        vector = self._vectorize(message)
+        with self._lock:
+            self._unindex(key)
+            if vector is not None:
+                self._index[key] = bucket
+                self._buckets.setdefault(bucket, {})[key] = vector
+                self._bucket_matrices.pop(bucket, None)
+                while len(self._index) > self.max_entries:
+                    self._unindex(next(iter(self._index)))
+    
+    def clear(self):
+        """Forget every cached response; entries left in a shared backend expire by TTL"""
+        with self._lock:
+            self._generation += 1
+            self._index.clear()
+            self._buckets.clear()
+            self._bucket_matrices.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'indexed_entries': len(self._index),
+            'hits': self.hits,
+            'similar_hits': self.similar_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
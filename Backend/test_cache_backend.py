@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Cache Backend Test Script
+Checks that RedisBackend shares cached values and pub/sub notifications
+between workers. Runs against an in-memory fake of the redis-py client, so
+neither a Redis server nor the redis package is needed.
+"""
+
+import sys
+import time
+import logging
+import queue
+import threading
+from typing import Dict, List
+
+from cache_backend import RedisBackend
+from response_cache import ResponseCache
+
+class FakeRedisServer:
+    """Keys and channel subscriptions shared by every FakeRedis client"""
+
+    def __init__(self):
+        self.data: Dict[str, tuple] = {}
+        self.subscriptions: Dict[str, List["FakePubSub"]] = {}
+        self.lock = threading.Lock()
+
+class FakeListener(threading.Thread):
+    """Stands in for the thread returned by redis-py's PubSub.run_in_thread"""
+
+    def __init__(self, pubsub: "FakePubSub"):
+        super().__init__(daemon=True)
+        self.pubsub = pubsub
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                channel, data = self.pubsub.messages.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            self.pubsub.handlers[channel]({'type': 'message', 'channel': channel, 'data': data})
+
+    def stop(self):
+        self._stopped.set()
+
+class FakePubSub:
+    def __init__(self, server: FakeRedisServer):
+        self.server = server
+        self.handlers = {}
+        self.messages: "queue.Queue[tuple]" = queue.Queue()
+
+    def subscribe(self, **handlers):
+        with self.server.lock:
+            for channel, handler in handlers.items():
+                self.handlers[channel] = handler
+                self.server.subscriptions.setdefault(channel, []).append(self)
+
+    def run_in_thread(self, sleep_time: float = 0.0, daemon: bool = False) -> FakeListener:
+        listener = FakeListener(self)
+        listener.start()
+        return listener
+
+    def close(self):
+        with self.server.lock:
+            for subscribers in self.server.subscriptions.values():
+                if self in subscribers:
+                    subscribers.remove(self)
+
+class FakeRedis:
+    """The subset of the redis-py client interface RedisBackend uses"""
+
+    def __init__(self, server: FakeRedisServer):
+        self.server = server
+        self.closed = False
+
+    def get(self, key: str):
+        with self.server.lock:
+            entry = self.server.data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self.server.data[key]
+                return None
+            return value.encode()
+
+    def set(self, key: str, value: str, px: int = None):
+        with self.server.lock:
+            self.server.data[key] = (value, time.monotonic() + px / 1000 if px else None)
+
+    def delete(self, key: str):
+        with self.server.lock:
+            self.server.data.pop(key, None)
+
+    def publish(self, channel: str, message: str):
+        with self.server.lock:
+            subscribers = list(self.server.subscriptions.get(channel, ()))
+        for pubsub in subscribers:
+            pubsub.messages.put((channel, message.encode()))
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> FakePubSub:
+        return FakePubSub(self.server)
+
+    def close(self):
+        self.closed = True
+
+def wait_for(condition, timeout: float = 2.0) -> bool:
+    """Poll condition until it holds or timeout seconds pass"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+class CacheBackendTester:
+    def __init__(self):
+        self.failures = 0
+
+    def check(self, description: str, passed: bool, details: str = ""):
+        if passed:
+            print(f"   ✅ {description}")
+        else:
+            self.failures += 1
+            print(f"   ❌ {description} {details}")
+
+    def test_shared_values(self):
+        """Test that workers sharing a server share cached values"""
+        print("🗄️  Testing Shared Values")
+        print("=" * 50)
+        server = FakeRedisServer()
+        worker1 = RedisBackend(client=FakeRedis(server))
+        worker2 = RedisBackend(client=FakeRedis(server))
+
+        worker1.set("catalog:v1:get_product_by_id:[1]", {"id": 1, "name": "Jeans"})
+        self.check("Value written by one worker is read by another",
+                   worker2.get("catalog:v1:get_product_by_id:[1]") == {"id": 1, "name": "Jeans"})
+        self.check("Keys are namespaced with the prefix",
+                   "ecommerce:catalog:v1:get_product_by_id:[1]" in server.data)
+
+        worker1.set("short_lived", "value", ttl=0.05)
+        time.sleep(0.1)
+        self.check("Entries expire after their TTL", worker2.get("short_lived") is None)
+
+        worker2.delete("catalog:v1:get_product_by_id:[1]")
+        self.check("Deletes are seen by every worker",
+                   worker1.get("catalog:v1:get_product_by_id:[1]") is None)
+
+        cache1 = ResponseCache(backend=worker1)
+        cache2 = ResponseCache(backend=worker2)
+        cache1.set("What is your return policy?", "return_policy", {}, "", "30 days", False)
+        cached = cache2.get("what is your RETURN policy", "return_policy", {}, "")
+        self.check("LLM responses cached by one worker are served by another",
+                   cached == ("30 days", False), f"(got {cached!r})")
+
+        worker1.close()
+        worker2.close()
+
+    def test_pubsub(self):
+        """Test that published messages reach subscribers in other workers"""
+        print("\n📣 Testing Pub/Sub")
+        print("=" * 50)
+        server = FakeRedisServer()
+        worker1 = RedisBackend(client=FakeRedis(server))
+        worker2 = RedisBackend(client=FakeRedis(server))
+
+        received1, received2, other = [], [], []
+        worker1.subscribe("catalog_reloaded", received1.append)
+        worker2.subscribe("catalog_reloaded", received2.append)
+        worker2.subscribe("catalog_reloaded", other.append)
+        worker2.subscribe("other_channel", other.append)
+
+        worker1.publish("catalog_reloaded", {"catalog_version": "abc123"})
+        self.check("Publisher's own subscriber is notified",
+                   wait_for(lambda: received1 == [{"catalog_version": "abc123"}]), f"(got {received1})")
+        self.check("Other worker's subscriber is notified",
+                   wait_for(lambda: received2 == [{"catalog_version": "abc123"}]), f"(got {received2})")
+        self.check("Every callback on a channel is called once", wait_for(lambda: len(other) == 1))
+
+        # A malformed payload is logged and skipped; the listener keeps running
+        server.subscriptions["ecommerce:catalog_reloaded"][1].messages.put(
+            ("ecommerce:catalog_reloaded", b"not json")
+        )
+        worker1.publish("catalog_reloaded", {"catalog_version": "def456"})
+        self.check("Listener survives malformed messages",
+                   wait_for(lambda: received2[-1:] == [{"catalog_version": "def456"}]), f"(got {received2})")
+
+        listener = worker2._listener
+        client = worker2.client
+        worker2.close()
+        self.check("close() stops the listener and closes the client",
+                   wait_for(lambda: not listener.is_alive()) and client.closed)
+        worker1.publish("catalog_reloaded", {"catalog_version": "ghi789"})
+        self.check("Closed workers are no longer notified",
+                   wait_for(lambda: len(received1) == 3) and len(received2) == 2)
+        worker1.close()
+
+    def test_unreachable_server(self):
+        """Test that a down server degrades to misses instead of failing callers"""
+        print("\n🔌 Testing Unreachable Server")
+        print("=" * 50)
+
+        class DownRedis:
+            def __getattr__(self, name):
+                def fail(*args, **kwargs):
+                    raise ConnectionError("Connection refused")
+                return fail
+
+        backend = RedisBackend(client=DownRedis())
+        try:
+            backend.subscribe("catalog_reloaded", lambda message: None)
+            backend.set("key", "value", ttl=1)
+            backend.publish("catalog_reloaded", {"catalog_version": "abc123"})
+            value = backend.get("key")
+            self.check("Calls on a down server don't raise", value is None)
+        except Exception as e:
+            self.check("Calls on a down server don't raise", False, f"({e!r})")
+        self.check("A failed subscribe can be retried", "catalog_reloaded" not in backend._subscribers)
+
+    def run_all(self) -> bool:
+        self.test_shared_values()
+        self.test_pubsub()
+        self.test_unreachable_server()
+
+        print("\n" + "=" * 50)
+        if self.failures:
+            print(f"❌ {self.failures} check(s) failed")
+        else:
+            print("🎉 All cache backend checks passed!")
+        return self.failures == 0
+
+def main():
+    # The checks provoke cache errors on purpose; keep their logs out of the report
+    logging.getLogger("cache_backend").setLevel(logging.CRITICAL)
+    tester = CacheBackendTester()
+    sys.exit(0 if tester.run_all() else 1)
+
+if __name__ == "__main__":
+    main()
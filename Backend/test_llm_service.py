@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+LLM Service Test Script
+Checks the Groq client's retry, circuit breaker and request coalescing
+behaviour against a mocked upstream (httpx.MockTransport), so no API key or
+network access is needed.
+"""
+
+import sys
+import time
+import asyncio
+import logging
+import httpx
+from typing import Callable, List
+
+from llm_service import LLMService
+
+def completion(content: str) -> httpx.Response:
+    """A successful chat completion response"""
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+class LLMServiceTester:
+    def __init__(self):
+        self.failures = 0
+
+    def make_service(self, handler: Callable, **kwargs) -> LLMService:
+        """An LLMService whose upstream calls are answered by handler"""
+        options = {"backoff_base": 0.01, "backoff_max": 0.05}
+        options.update(kwargs)
+        service = LLMService(api_key="test-key", base_url="http://llm.test/v1", **options)
+        service._client = httpx.AsyncClient(
+            base_url=service.base_url, transport=httpx.MockTransport(handler)
+        )
+        return service
+
+    def check(self, description: str, passed: bool, details: str = ""):
+        if passed:
+            print(f"   ✅ {description}")
+        else:
+            self.failures += 1
+            print(f"   ❌ {description} {details}")
+
+    async def test_retries(self):
+        """Test retrying of transient upstream failures"""
+        print("🔄 Testing Retries")
+        print("=" * 50)
+        messages = [{"role": "user", "content": "hello"}]
+
+        # 1. Transient errors are retried until a success
+        statuses: List[int] = [503, 429]
+        calls = []
+        def flaky(request):
+            calls.append(request)
+            if statuses:
+                return httpx.Response(statuses.pop(0), json={"error": "busy"})
+            return completion("recovered")
+        service = self.make_service(flaky, max_retries=2)
+        result = await service._make_request(messages)
+        self.check("503 and 429 are retried", result == "recovered" and len(calls) == 3,
+                   f"(result={result!r}, calls={len(calls)})")
+        self.check("Success keeps the circuit closed",
+                   not service.circuit_breaker.is_open and service.circuit_breaker.failure_count == 0)
+        await service.close()
+
+        # 2. Client errors are not retried
+        calls = []
+        def bad_request(request):
+            calls.append(request)
+            return httpx.Response(400, json={"error": "bad request"})
+        service = self.make_service(bad_request, max_retries=2)
+        result = await service._make_request(messages)
+        self.check("400 is not retried", result is None and len(calls) == 1, f"(calls={len(calls)})")
+        await service.close()
+
+        # 3. Transport errors are retried, then give up
+        calls = []
+        def unreachable(request):
+            calls.append(request)
+            raise httpx.ConnectError("connection refused", request=request)
+        service = self.make_service(unreachable, max_retries=2)
+        result = await service._make_request(messages)
+        self.check("Connection errors are retried max_retries times",
+                   result is None and len(calls) == 3, f"(calls={len(calls)})")
+        await service.close()
+
+        # 4. Retry-After is honoured, capped at backoff_max
+        service = self.make_service(unreachable, backoff_max=2.0)
+        delay = service._retry_delay(0, httpx.Response(429, headers={"Retry-After": "1"}))
+        capped = service._retry_delay(0, httpx.Response(429, headers={"Retry-After": "60"}))
+        self.check("Retry-After sets the delay", delay == 1.0 and capped == 2.0,
+                   f"(delay={delay}, capped={capped})")
+        await service.close()
+
+    async def test_circuit_breaker(self):
+        """Test that repeated failures open the circuit and a trial call closes it"""
+        print("\n⚡ Testing Circuit Breaker")
+        print("=" * 50)
+        messages = [{"role": "user", "content": "hello"}]
+
+        state = {"healthy": False, "calls": 0}
+        def upstream(request):
+            state["calls"] += 1
+            if state["healthy"]:
+                return completion("back online")
+            return httpx.Response(503, json={"error": "down"})
+        service = self.make_service(upstream, max_retries=0, failure_threshold=3, reset_timeout=0.2)
+
+        # 1. failure_threshold failed calls open the circuit
+        for _ in range(3):
+            await service._make_request(messages)
+        self.check("Circuit opens after 3 failures", service.circuit_breaker.is_open)
+
+        # 2. While open, calls fail fast without going upstream
+        calls_before = state["calls"]
+        start = time.perf_counter()
+        result = await service._make_request(messages)
+        self.check("Open circuit short-circuits calls",
+                   result is None and state["calls"] == calls_before,
+                   f"(upstream calls={state['calls'] - calls_before})")
+        fallback, _ = await service.generate_response("hello", [], "greeting", {})
+        self.check("Callers get the fallback response", bool(fallback) and state["calls"] == calls_before)
+        self.check("Short-circuited calls return immediately", time.perf_counter() - start < 0.1)
+
+        # 3. After reset_timeout a failed trial re-opens the circuit
+        await asyncio.sleep(0.25)
+        await service._make_request(messages)
+        self.check("Failed trial call re-opens the circuit",
+                   service.circuit_breaker.is_open and state["calls"] == calls_before + 1)
+
+        # 4. A successful trial closes it again
+        await asyncio.sleep(0.25)
+        state["healthy"] = True
+        result = await service._make_request(messages)
+        self.check("Successful trial call closes the circuit",
+                   result == "back online" and not service.circuit_breaker.is_open)
+        await service.close()
+
+    async def test_coalescing(self):
+        """Test that identical concurrent requests share one upstream call"""
+        print("\n🔗 Testing Request Coalescing")
+        print("=" * 50)
+
+        calls = []
+        async def slow_upstream(request):
+            calls.append(request)
+            await asyncio.sleep(0.2)
+            return completion("shared answer")
+        service = self.make_service(slow_upstream)
+
+        # 1. 100 concurrent identical turns make one upstream call
+        results = await asyncio.gather(*[
+            service.generate_response("What is your return policy?", [], "return_policy", {})
+            for _ in range(100)
+        ])
+        self.check("100 identical requests make 1 upstream call",
+                   len(calls) == 1 and service.coalesced_requests == 99,
+                   f"(calls={len(calls)}, coalesced={service.coalesced_requests})")
+        self.check("Every caller gets the shared answer",
+                   all(response == "shared answer" for response, _ in results))
+        self.check("In-flight table is emptied", not service._in_flight)
+
+        # 2. Different prompts are not coalesced
+        calls.clear()
+        await asyncio.gather(*[
+            service._make_request([{"role": "user", "content": f"question {i}"}])
+            for i in range(3)
+        ])
+        self.check("Distinct requests each go upstream", len(calls) == 3, f"(calls={len(calls)})")
+
+        # 3. Cancelling the first caller doesn't cancel the shared call
+        calls.clear()
+        messages = [{"role": "user", "content": "shared"}]
+        first = asyncio.create_task(service._make_request(messages))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(service._make_request(messages))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        self.check("Remaining caller still gets the answer",
+                   result == "shared answer" and len(calls) == 1, f"(result={result!r})")
+        await service.close()
+
+    async def run_all(self):
+        await self.test_retries()
+        await self.test_circuit_breaker()
+        await self.test_coalescing()
+
+        print("\n" + "=" * 50)
+        if self.failures:
+            print(f"❌ {self.failures} check(s) failed")
+        else:
+            print("🎉 All LLM service checks passed!")
+        return self.failures == 0
+
+def main():
+    # The checks provoke upstream errors on purpose; keep their logs out of the report
+    logging.getLogger("llm_service").setLevel(logging.CRITICAL)
+    tester = LLMServiceTester()
+    passed = asyncio.run(tester.run_all())
+    sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import re
+import threading
+import logging
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'stopwords': 'corpora/stopwords',
+    'wordnet': 'corpora/wordnet'
+}
+
+class TextPreprocessor:
+    """Text preprocessing shared by the trainer and the runtime classifier.
+
+    NLTK resources are checked and loaded once when the preprocessor is built,
+    and lemmatization is memoized per token with a bounded LRU cache.
+    """
+
+    def __init__(self, lemma_cache_size: int = 10000):
+        import nltk
+        from nltk.corpus import stopwords
+        from nltk.tokenize import word_tokenize
+        from nltk.stem import WordNetLemmatizer
+
+        # Download required NLTK data if not available
+        for package, resource in NLTK_RESOURCES.items():
+            try:
+                nltk.data.find(resource)
+            except LookupError:
+                nltk.download(package)
+
+        self._word_tokenize = word_tokenize
+        self.stop_words = frozenset(stopwords.words('english'))
+        self.lemmatizer = WordNetLemmatizer()
+        self.lemmatize = lru_cache(maxsize=lemma_cache_size)(self.lemmatizer.lemmatize)
+
+        # Warm up WordNet so the lazy corpus load doesn't land on the first request
+        self.lemmatize('warmup')
+
+    def preprocess(self, text: str) -> str:
+        """Lowercase, strip non-letters, drop stopwords and lemmatize"""
+        text = text.lower()
+        text = re.sub(r'[^a-zA-Z\s]', ' ', text)
+
+        tokens = self._word_tokenize(text)
+        tokens = [self.lemmatize(token) for token in tokens
+                 if token not in self.stop_words and len(token) > 2]
+
+        return ' '.join(tokens)
+
+_preprocessor: Optional[TextPreprocessor] = None
+_preprocessor_lock = threading.Lock()
+
+def get_text_preprocessor() -> TextPreprocessor:
+    """Get the process-wide preprocessor, loading NLTK resources on first use"""
+    global _preprocessor
+    if _preprocessor is None:
+        with _preprocessor_lock:
+            if _preprocessor is None:
+                _preprocessor = TextPreprocessor()
+                logger.info("Text preprocessing pipeline loaded")
+    return _preprocessor
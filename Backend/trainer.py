@@ -10,26 +10,7 @@ import re
 import json
 import logging
 from typing import List, Dict, Any, Tuple
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-
-try:
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('wordnet')
+from text_preprocessing import get_text_preprocessor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -43,8 +24,7 @@ class ChatbotTrainer:
             lowercase=True
         )
         self.intent_classifier = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.lemmatizer = WordNetLemmatizer()
-        self.stop_words = set(stopwords.words('english'))
+        self.preprocessor = get_text_preprocessor()
         
         # Training data for different intents
         self.training_data = self._create_training_data()
@@ -164,20 +144,8 @@ class ChatbotTrainer:
     
     def preprocess_text(self, text: str) -> str:
         """Preprocess text for better classification"""
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove special characters but keep spaces
-        text = re.sub(r'[^a-zA-Z\s]', ' ', text)
-        
-        # Tokenize
-        tokens = word_tokenize(text)
-        
-        # Remove stopwords and lemmatize
-        tokens = [self.lemmatizer.lemmatize(token) for token in tokens 
-                 if token not in self.stop_words and len(token) > 2]
-        
-        return ' '.join(tokens)
+        # Same pipeline as the runtime classifier in chatbot.py
+        return self.preprocessor.preprocess(text)
     
     def train(self) -> Dict[str, Any]:
         """Train the intent classification model"""